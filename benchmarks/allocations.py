@@ -0,0 +1,167 @@
+"""
+Memory allocation benchmark for headLineStyle.
+
+Traces the memory allocated with `tracemalloc` while a new styler styles
+the corpus of a workload of `benchmarks.run` once, and reports, per 1000
+headlines, the number and size of the memory blocks that every call
+allocates in the package and that are still held when it returns, by its
+result and by the caches it fills. They are counted from the difference of
+the snapshot statistics taken before and after every call, which works on
+every version of Python that the package supports. With ``--baseline REF``
+the package of that git revision is measured the same way, each in its
+own interpreter. Revisions before `HeadlineStyler` and its ``engine``
+argument are measured with `headLineStyle.headLineStyle`, and those before
+``overrides`` without the overrides workload.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.allocations
+    python -m benchmarks.allocations --baseline HEAD~1 --workloads plain,callback
+"""
+
+import argparse
+import inspect
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from collections import OrderedDict
+from functools import partial
+
+from benchmarks import run
+from benchmarks.import_time import ROOT, _extract
+
+# name -> workload of `benchmarks.run`
+WORKLOADS = OrderedDict([
+    ('plain', 'short'),
+    ('all_caps', 'all_caps'),
+    ('callback', 'callback'),
+    ('overrides', 'overrides'),
+])
+
+
+def measure(style, texts, package_dir):
+    """
+    Return the allocations of styling `texts` with `style`, per 1000 texts:
+    the number and size of the memory blocks allocated by the package in
+    every call that are still held when it returns, by its result or by
+    the caches it fills, counted from the statistics of the snapshots taken
+    before and after every call
+    """
+    filters = [tracemalloc.Filter(True, os.path.join(package_dir, '*'))]
+    tracemalloc.start()
+    blocks = size = 0
+    for text in texts:
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        result = style(text)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+        for stat in after.compare_to(before, 'lineno'):
+            if stat.count_diff > 0:
+                blocks += stat.count_diff
+                size += stat.size_diff
+        del result
+    tracemalloc.stop()
+    per_1k = 1000.0 / len(texts)
+    return OrderedDict([
+        ('blocks', blocks * per_1k),
+        ('kib', size / 1024.0 * per_1k),
+    ])
+
+
+def _make_style(headLineStyle, wordlist_mode, tmpdir):
+    """
+    Return the function styling a workload with the wordlist given as
+    `wordlist_mode`, or None if the package has no styler for it
+    """
+    styler = getattr(headLineStyle, 'HeadlineStyler', None)
+    parameters = inspect.signature(styler).parameters if styler is not None else {}
+    if 'engine' in parameters and (wordlist_mode is None or wordlist_mode in parameters):
+        return run._make_styler(headLineStyle, 'classifier', wordlist_mode, tmpdir)
+    if wordlist_mode is None:
+        return headLineStyle.headLineStyle
+    if wordlist_mode != 'callback':
+        return None
+    callback = headLineStyle.create_wordlist_filter_from_file(run._wordlist_path(tmpdir))
+    return partial(headLineStyle.headLineStyle, callback=callback)
+
+
+def run_child(workloads, count):
+    """Measure the workloads with the package importable in this interpreter"""
+    import headLineStyle
+    package_dir = os.path.dirname(os.path.abspath(headLineStyle.__file__))
+    tmpdir = tempfile.mkdtemp()
+    results = OrderedDict()
+    try:
+        for name in workloads:
+            generate, _, wordlist_mode = run.WORKLOADS[WORKLOADS[name]]
+            texts = generate(count)
+            style = _make_style(headLineStyle, wordlist_mode, tmpdir)
+            if style is None:
+                continue
+            # Compile the patterns of the package before tracing
+            headLineStyle.headLineStyle('warm up')
+            results[name] = measure(style, texts, package_dir)
+    finally:
+        shutil.rmtree(tmpdir)
+    return results
+
+
+def measure_package(package_root, workloads, count):
+    """Run `run_child` in an interpreter importing the package from `package_root`"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([package_root, ROOT]))
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'benchmarks.allocations', '--child',
+         '--workloads', ','.join(workloads), '--count', str(count)],
+        cwd=package_root, env=env, universal_newlines=True)
+    return json.loads(output, object_pairs_hook=OrderedDict)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help='Comma separated workloads to run (%(default)s)')
+    parser.add_argument('--count', type=int, default=1000, help='Headlines styled per workload (%(default)s)')
+    parser.add_argument('--baseline', metavar='REF', help='Git revision to compare against')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    workloads = args.workloads.split(',')
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error('Unknown workloads: %s' % ', '.join(sorted(unknown)))
+
+    if args.child:
+        json.dump(run_child(workloads, args.count), sys.stdout)
+        return
+
+    results = measure_package(ROOT, workloads, args.count)
+    baseline = None
+    if args.baseline:
+        baseline_root = tempfile.mkdtemp()
+        try:
+            _extract(args.baseline, baseline_root)
+            baseline = measure_package(baseline_root, workloads, args.count)
+        finally:
+            shutil.rmtree(baseline_root)
+
+    print('Allocations per 1000 headlines:')
+    header = '%-12s %10s %10s' % ('workload', 'blocks', 'KiB')
+    if baseline is not None:
+        header += ' %11s %10s' % ('base blocks', 'base KiB')
+    print(header)
+    for name, result in results.items():
+        line = '%-12s %10.1f %10.1f' % (name, result['blocks'], result['kib'])
+        if baseline is not None:
+            base = baseline.get(name)
+            if base is None:
+                line += ' %11s %10s' % ('-', '-')
+            else:
+                line += ' %11.1f %10.1f' % (base['blocks'], base['kib'])
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
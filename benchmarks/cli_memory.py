@@ -0,0 +1,69 @@
+"""
+Peak memory of the command line on input files of growing size.
+
+Writes files of short titles of the given sizes, styles each of them with
+``headLineStyle -f FILE -o FILE`` in a child process, and reports the
+peak resident set size and the throughput of every run. The peak should
+not grow with the size of the file.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.cli_memory
+    python -m benchmarks.cli_memory --sizes 10,100,1000 --jobs 4
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_corpus(path, megabytes):
+    """Write at least `megabytes` MiB of short titles to `path`"""
+    block = ('\n'.join(corpus.short_titles(10000)) + '\n').encode('utf-8')
+    with open(path, 'wb') as f:
+        for _ in range(megabytes * (1 << 20) // len(block) + 1):
+            f.write(block)
+
+
+def run(input_path, output_path, jobs):
+    """Style a file in a child process, returning its elapsed time and peak RSS in KiB"""
+    start = time.perf_counter()
+    pid = subprocess.Popen(
+        [sys.executable, '-c', 'import headLineStyle; headLineStyle.cmd()', '-w', os.devnull,
+         '-f', input_path, '-o', output_path, '--jobs', str(jobs)], cwd=ROOT).pid
+    _, status, usage = os.wait4(pid, 0)
+    elapsed = time.perf_counter() - start
+    if status:
+        raise RuntimeError('headLineStyle exited with status %d' % status)
+    return elapsed, usage.ru_maxrss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10,50,200', help='Comma separated file sizes in MiB (%(default)s)')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes of every run (%(default)s)')
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print('%8s %12s %14s' % ('MiB', 'peak RSS KiB', 'MiB/sec'))
+        for size in [int(size) for size in args.sizes.split(',')]:
+            input_path = os.path.join(tmpdir, 'input.txt')
+            write_corpus(input_path, size)
+            elapsed, peak = run(input_path, os.path.join(tmpdir, 'output.txt'), args.jobs)
+            megabytes = os.path.getsize(input_path) / float(1 << 20)
+            print('%8.0f %12d %14.1f' % (megabytes, peak, megabytes / elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
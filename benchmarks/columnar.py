@@ -0,0 +1,75 @@
+"""
+Benchmark of the columnar API against styling every row.
+
+Builds a column of headlines with a given ratio of distinct values, and
+times `headline_style_series` against ``series.map(headLineStyle)``, and
+`headline_style_arrow` against styling every value of ``to_pylist()``.
+The word cache is left disabled so that every row styled costs the same.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.columnar
+    python -m benchmarks.columnar --rows 1000000 --distinct 0.05
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks import corpus
+from headLineStyle import headLineStyle
+from headLineStyle.columnar import headline_style_arrow, headline_style_series
+
+
+def column(rows, distinct, seed=0):
+    """`rows` headlines, of which about a `distinct` fraction are distinct"""
+    titles = corpus.short_titles(max(1, int(rows * distinct)), seed)
+    rand = random.Random(seed)
+    return [rand.choice(titles) for _ in range(rows)]
+
+
+def best_of(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=200000, help='Rows in the column (%(default)s)')
+    parser.add_argument('--distinct', type=float, default=0.05,
+                        help='Fraction of distinct values in the column (%(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes of every benchmark')
+    args = parser.parse_args(argv)
+
+    values = column(args.rows, args.distinct)
+    results = []
+    try:
+        import pandas
+    except ImportError:
+        print('pandas is not installed, skipping the Series benchmarks')
+    else:
+        series = pandas.Series(values)
+        results.append(('pandas .map', best_of(lambda: series.map(headLineStyle), args.repeat)))
+        results.append(('headline_style_series', best_of(lambda: headline_style_series(series), args.repeat)))
+    try:
+        import pyarrow
+    except ImportError:
+        print('pyarrow is not installed, skipping the Arrow benchmarks')
+    else:
+        array = pyarrow.array(values)
+        results.append(('pyarrow to_pylist', best_of(
+            lambda: pyarrow.array([headLineStyle(value) for value in array.to_pylist()]), args.repeat)))
+        results.append(('headline_style_arrow', best_of(lambda: headline_style_arrow(array), args.repeat)))
+
+    print('%d rows, %d distinct' % (len(values), len(set(values))))
+    for name, elapsed in results:
+        print('%-24s %10.1f ms %12.0f rows/sec' % (name, elapsed * 1e3, len(values) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
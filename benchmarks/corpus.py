@@ -0,0 +1,120 @@
+"""
+Deterministic corpus generators for the headLineStyle benchmarks.
+
+Every generator takes the number of items to produce and a seed, and
+returns the same list of strings for the same arguments on every run and
+every platform, so that timings of different runs can be compared.
+"""
+
+import random
+
+WORDS = (
+    'apple', 'deal', 'falls', 'through', 'market', 'report', 'shares', 'rise', 'after', 'quarter',
+    'election', 'results', 'show', 'record', 'turnout', 'storm', 'hits', 'coast', 'city', 'council',
+    'votes', 'budget', 'school', 'reopens', 'season', 'finale', 'review', 'policy', 'change', 'energy',
+    'prices', 'climb', 'again', 'new', 'study', 'finds', 'link', 'between', 'sleep', 'health',
+    'mcdonald', 'macarthur', "o'reilly", "d'angelo", 'iphone', 'itunes', 'washington', 'nasa', 'cnn',
+    'startup', 'raises', 'funding', 'round', 'court', 'rules', 'against', 'merger', 'plan', 'talks',
+)
+SMALL_WORDS = ('a', 'an', 'and', 'as', 'at', 'but', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'vs')
+COMPOUNDS = (
+    'end-to-end', 'two-not-three', 'three-by-four', 'state-of-the-art', 'and/or', 'input/output',
+    'peer-to-peer', 'mcfoo-bar', 'day-to-day', 'client/server', 'read-only', 'x-ray', 'e-mail',
+)
+UNICODE_WORDS = (
+    'el', 'niño', 'arrivé', 'hier', 'crème', 'brûlée', 'façade', 'über', 'straße', 'smörgåsbord',
+    'ýæ', 'ñø', 'café', 'déjà', 'vu', 'jalapeño', 'naïve', 'résumé', 'zoë', 'ångström',
+)
+ACRONYMS = (
+    'UDP', 'TCP', 'PPPoE', 'HTTP', 'iOS', 'macOS', 'AT&T', 'NASA', 'FBI', 'CEO', 'IPO', 'AI',
+    'GPU', 'CPU', 'API', 'SaaS', 'IoT', 'VPN', 'DNS', 'SQL',
+)
+PUNCTUATION = (':', ',', '?', ' -', ' —', ';')
+
+
+def _title(rand, vocabulary, length, small_ratio=0.25):
+    words = []
+    for _ in range(length):
+        if rand.random() < small_ratio:
+            words.append(rand.choice(SMALL_WORDS))
+        else:
+            words.append(rand.choice(vocabulary))
+    if length > 4 and rand.random() < 0.3:
+        position = rand.randrange(1, length - 1)
+        words[position] += rand.choice(PUNCTUATION)
+    return ' '.join(words)
+
+
+def short_titles(count, seed=0):
+    """Typical lower case headlines of 4 to 12 words"""
+    rand = random.Random(seed)
+    return [_title(rand, WORDS, rand.randint(4, 12)) for _ in range(count)]
+
+
+def all_caps(count, seed=0):
+    """All caps wire headlines"""
+    rand = random.Random(seed)
+    return [_title(rand, WORDS, rand.randint(4, 12)).upper() for _ in range(count)]
+
+
+def compounds(count, seed=0):
+    """Technical headlines heavy in hyphenated and slashed words"""
+    rand = random.Random(seed)
+    return [_title(rand, WORDS + COMPOUNDS * 3, rand.randint(4, 12)) for _ in range(count)]
+
+
+def hyphen_heavy(count, seed=0):
+    """
+    Headlines made only of compounds, some of them joined by slashes, like
+    "end-to-end two-not-three/three-by-four"
+    """
+    rand = random.Random(seed)
+    hyphenated = tuple(compound for compound in COMPOUNDS if '/' not in compound)
+    titles = []
+    for _ in range(count):
+        words = []
+        for _ in range(rand.randint(2, 6)):
+            word = rand.choice(hyphenated)
+            if rand.random() < 0.3:
+                word += '/' + rand.choice(hyphenated)
+            words.append(word)
+        titles.append(' '.join(words))
+    return titles
+
+
+def unicode_titles(count, seed=0):
+    """Headlines with accented and other non-ASCII letters"""
+    rand = random.Random(seed)
+    return [_title(rand, WORDS + UNICODE_WORDS * 2, rand.randint(4, 12)) for _ in range(count)]
+
+
+def acronym_titles(count, seed=0):
+    """Headlines mentioning the acronyms of `acronym_wordlist`"""
+    rand = random.Random(seed)
+    vocabulary = WORDS + tuple(acronym.lower() for acronym in ACRONYMS)
+    return [_title(rand, vocabulary, rand.randint(4, 12)) for _ in range(count)]
+
+
+def long_lines(count, seed=0, length=2000):
+    """Single lines of `length` words"""
+    rand = random.Random(seed)
+    return [_title(rand, WORDS + COMPOUNDS, length) for _ in range(count)]
+
+
+def acronym_wordlist(size=len(ACRONYMS), seed=0):
+    """
+    A wordlist for `create_wordlist_filter_from_file`: the known acronyms,
+    padded with generated entries up to `size` lines.
+    """
+    rand = random.Random(seed)
+    entries = list(ACRONYMS[:size])
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    seen = set(entry.upper() for entry in entries)
+    while len(entries) < size:
+        entry = ''.join(rand.choice(letters) for _ in range(rand.randint(3, 7)))
+        if rand.random() < 0.3:
+            entry = entry[0] + entry[1:].lower()
+        if entry.upper() not in seen:
+            seen.add(entry.upper())
+            entries.append(entry)
+    return entries
@@ -0,0 +1,83 @@
+"""
+Cold start benchmark for headLineStyle.
+
+Times fresh interpreters importing the package, and running the command
+line once on a single title, which is what short scripts and shell
+pipelines pay on every invocation. With ``--baseline REF`` the package of
+that git revision is extracted to a temporary directory and timed the same
+way, and the speedup over it is reported.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --baseline HEAD~1 --runs 50
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = (
+    ('import', ['-c', 'import headLineStyle']),
+    ('cli', ['-c', 'import headLineStyle; headLineStyle.cmd()', 'the quick brown fox jumps over the lazy dog']),
+)
+
+
+def _extract(ref, directory):
+    archive = subprocess.check_output(['git', 'archive', ref, 'headLineStyle'], cwd=ROOT)
+    subprocess.run(['tar', '-x', '-C', directory], input=archive, check=True)
+
+
+def measure(package_root, args, runs):
+    """Return the sorted wall times of `runs` interpreters running `args`"""
+    env = dict(os.environ, PYTHONPATH=package_root)
+    command = [sys.executable] + args
+    # Warm up the file system cache and write the bytecode cache once
+    subprocess.check_call(command, cwd=package_root, env=env, stdout=subprocess.DEVNULL)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call(command, cwd=package_root, env=env, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=20, help='Interpreters started per scenario (%(default)s)')
+    parser.add_argument('--baseline', metavar='REF', help='Git revision to compare against')
+    args = parser.parse_args(argv)
+
+    baseline_root = None
+    if args.baseline:
+        baseline_root = tempfile.mkdtemp()
+        _extract(args.baseline, baseline_root)
+    try:
+        # The interpreter start up alone, subtracted from every scenario
+        python = measure(ROOT, ['-c', 'pass'], args.runs)[args.runs // 2]
+        header = '%-10s %12s' % ('scenario', 'median ms')
+        if baseline_root:
+            header += ' %12s %9s' % ('baseline ms', 'speedup')
+        print(header)
+        for name, scenario in SCENARIOS:
+            median = measure(ROOT, scenario, args.runs)[args.runs // 2] - python
+            line = '%-10s %12.1f' % (name, median * 1e3)
+            if baseline_root:
+                base = measure(baseline_root, scenario, args.runs)[args.runs // 2] - python
+                line += ' %12.1f %8.1fx' % (base * 1e3, base / median)
+            print(line)
+        print('(interpreter start up of %.1f ms excluded)' % (python * 1e3))
+    finally:
+        if baseline_root:
+            shutil.rmtree(baseline_root)
+
+
+if __name__ == '__main__':
+    main()
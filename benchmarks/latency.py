@@ -0,0 +1,110 @@
+"""
+Latency growth of headLineStyle on adversarial input.
+
+Styles texts built to stress every pattern of the package, e.g. lines of
+punctuation, single words of 100k characters or runs of sub-phrases, at
+doubling sizes, and reports the time per 1000 characters of every size and
+the growth exponent between the smallest and the largest: 1.0 is linear,
+2.0 quadratic. Random texts from an alphabet of the characters the patterns
+look for are styled the same way, as a fuzz test of the growth of the cases
+not listed.
+
+The styler is a `HeadlineStyler` with the limits given on the command line,
+none by default; without a maximum word length, the "mc" case shows the
+cost of the Mc/Mac rule, or fails with a RecursionError.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.latency
+    python -m benchmarks.latency --max-line-length 4096 --max-word-length 256 --sizes 8
+"""
+
+import argparse
+import math
+import random
+import time
+
+from headLineStyle import HeadlineStyler
+
+FUZZ_ALPHABET = 'aAbmMcCdlo.\'-/:;!?" \t—éÉ'
+
+
+def _repeat(pattern):
+    return lambda n: (pattern * (n // len(pattern) + 1))[:n]
+
+
+def _fuzz(n, seed=0):
+    rand = random.Random(seed)
+    return ''.join(rand.choice(FUZZ_ALPHABET) for _ in range(n))
+
+
+# name -> function of the number of characters returning a text
+CASES = [
+    ('words', _repeat('the quick brown fox of ')),
+    ('punctuation', _repeat('!"#(')),
+    ('letters', _repeat('a')),
+    ('mixed_case', lambda n: 'a' * (n - 1) + 'B'),
+    ('periods', _repeat('a.')),
+    ('initials', lambda n: ('A.' * n)[:n - 1] + 'a'),
+    ('hyphens', _repeat('a-')),
+    ('slashes', _repeat('a/')),
+    ('apostrophe', lambda n: "d'" + 'a' * (n - 3) + '!'),
+    ('subphrases', _repeat(': a ')),
+    ('small_first', lambda n: '(' * (n - 3) + 'the'),
+    ('small_last', lambda n: 'the' + '!' * (n - 3)),
+    ('spaces', _repeat(' ')),
+    ('mc', _repeat('mc')),
+    ('fuzz', _fuzz),
+]
+
+
+def measure(style, text, repeat):
+    """Return the fastest of `repeat` times of styling `text`, or None if it fails"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            style(text)
+            style(text.upper())
+        except RecursionError:
+            return None
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--start', type=int, default=4096, help='Characters of the smallest text (%(default)s)')
+    parser.add_argument('--sizes', type=int, default=6, help='Number of doubling sizes (%(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs of every text (%(default)s)')
+    parser.add_argument('--cases', default=','.join(name for name, _ in CASES),
+                        help='Comma separated cases to run (%(default)s)')
+    parser.add_argument('--max-line-length', type=int, help='max_line_length of the styler')
+    parser.add_argument('--max-word-length', type=int, help='max_word_length of the styler')
+    parser.add_argument('--engine', default='classifier', help='engine of the styler (%(default)s)')
+    args = parser.parse_args(argv)
+
+    cases = dict(CASES)
+    names = args.cases.split(',')
+    unknown = set(names) - set(cases)
+    if unknown:
+        parser.error('Unknown cases: %s' % ', '.join(sorted(unknown)))
+
+    style = HeadlineStyler(engine=args.engine, max_line_length=args.max_line_length,
+                           max_word_length=args.max_word_length).style
+    sizes = [args.start << i for i in range(args.sizes)]
+    print('us per 1000 characters, by characters styled')
+    print('%-12s %s %9s' % ('case', ' '.join('%9d' % size for size in sizes), 'exponent'))
+    for name in names:
+        times = [measure(style, cases[name](size), args.repeat) for size in sizes]
+        line = '%-12s %s' % (name, ' '.join(
+            '%9s' % ('error' if elapsed is None else '%.1f' % (elapsed / size * 1e9 / 2))
+            for elapsed, size in zip(times, sizes)))
+        if times[0] and times[-1]:
+            line += ' %9.2f' % (math.log(times[-1] / times[0]) / math.log(float(sizes[-1]) / sizes[0]))
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Load test for the ``headLineStyle --serve`` daemon.
+
+Opens a number of concurrent connections that each send titles from the
+short titles corpus one after the other, and reports the throughput and
+the latency percentiles of the requests. Start the daemon first::
+
+    headLineStyle --serve /tmp/headLineStyle.sock &
+    python -m benchmarks.loadtest /tmp/headLineStyle.sock --connections 32
+
+    headLineStyle --serve 127.0.0.1:8765 &
+    python -m benchmarks.loadtest 127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks import corpus
+from headLineStyle.server import parse_address
+
+
+async def _unix_client(path, texts, latencies):
+    reader, writer = await asyncio.open_unix_connection(path)
+    timer = time.perf_counter
+    for text in texts:
+        start = timer()
+        writer.write(text.encode('utf-8') + b'\n')
+        await reader.readline()
+        latencies.append(timer() - start)
+    writer.close()
+
+
+async def _http_client(host, port, texts, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    timer = time.perf_counter
+    for text in texts:
+        body = text.encode('utf-8')
+        start = timer()
+        writer.write(b'POST / HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n\r\n%s' % (
+            host.encode('ascii'), len(body), body))
+        length = 0
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b''):
+                break
+            if header.lower().startswith(b'content-length:'):
+                length = int(header.split(b':', 1)[1])
+        await reader.readexactly(length)
+        latencies.append(timer() - start)
+    writer.close()
+
+
+async def load(address, connections, requests):
+    """Run the load test, returning the elapsed time and sorted latencies"""
+    kind, where = parse_address(address)
+    texts = corpus.short_titles(requests)
+    latencies = []
+    clients = []
+    for i in range(connections):
+        share = texts[i::connections]
+        if kind == 'http':
+            clients.append(_http_client(where[0], where[1], share, latencies))
+        else:
+            clients.append(_unix_client(where, share, latencies))
+    start = time.perf_counter()
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('address', help='Unix socket path or HOST:PORT of the daemon')
+    parser.add_argument('--connections', type=int, default=16,
+                        help='Number of concurrent connections (%(default)s)')
+    parser.add_argument('--requests', type=int, default=20000,
+                        help='Total number of requests (%(default)s)')
+    args = parser.parse_args(argv)
+
+    elapsed, latencies = asyncio.run(load(args.address, args.connections, args.requests))
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1e3
+
+    print('%d requests over %d connections in %.2fs: %.0f requests/sec' % (
+        len(latencies), args.connections, elapsed, len(latencies) / elapsed))
+    print('latency ms: p50 %.2f  p90 %.2f  p99 %.2f  max %.2f' % (
+        percentile(0.5), percentile(0.9), percentile(0.99), latencies[-1] * 1e3))
+
+
+if __name__ == '__main__':
+    main()
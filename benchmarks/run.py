@@ -0,0 +1,204 @@
+"""
+Throughput, latency and memory benchmarks for headLineStyle.
+
+Every workload styles a deterministic corpus from `benchmarks.corpus` one
+text at a time, and reports operations per second, the median and 99th
+percentile latency of a single call, and the peak memory traced while
+styling the corpus once. Each backend runs in its own interpreter, the
+stdlib `re` one by hiding the `regex` module from the import system.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --workloads short,all_caps --backends re
+    python -m benchmarks.run --save baseline.json
+    python -m benchmarks.run --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from benchmarks import corpus
+
+BACKENDS = ('regex', 're')
+
+# name -> (corpus generator, number of texts, how the wordlist is passed to
+# the styler, if at all)
+WORKLOADS = OrderedDict([
+    ('short', (corpus.short_titles, 5000, None)),
+    ('all_caps', (corpus.all_caps, 5000, None)),
+    ('compounds', (corpus.compounds, 5000, None)),
+    ('hyphen_heavy', (corpus.hyphen_heavy, 5000, None)),
+    ('unicode', (corpus.unicode_titles, 5000, None)),
+    ('callback', (corpus.acronym_titles, 5000, 'callback')),
+    ('overrides', (corpus.acronym_titles, 5000, 'overrides')),
+    ('long_lines', (corpus.long_lines, 20, None)),
+])
+
+WORDLIST_SIZE = 100000
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _wordlist_path(tmpdir):
+    """Return the path of the wordlist file of the workloads, written to `tmpdir` once"""
+    path = os.path.join(tmpdir, 'wordlist.txt')
+    if not os.path.exists(path):
+        with open(path, 'w') as f:
+            f.write('\n'.join(corpus.acronym_wordlist(WORDLIST_SIZE)) + '\n')
+    return path
+
+
+def _make_styler(headLineStyle, engine, wordlist_mode, tmpdir):
+    if wordlist_mode is None:
+        return headLineStyle.HeadlineStyler(engine=engine).style
+    wordlist = headLineStyle.create_wordlist_filter_from_file(_wordlist_path(tmpdir))
+    return headLineStyle.HeadlineStyler(engine=engine, **{wordlist_mode: wordlist}).style
+
+
+def measure(style, texts, repeat=3):
+    """
+    Time `style` over every text, returning a dict of the results. The
+    fastest of `repeat` passes is used for the throughput, and the call
+    latencies of all passes for the percentiles.
+    """
+    for text in texts[:100]:
+        style(text)
+    latencies = []
+    best = None
+    timer = time.perf_counter
+    for _ in range(repeat):
+        start = timer()
+        for text in texts:
+            call_start = timer()
+            style(text)
+            latencies.append(timer() - call_start)
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    latencies.sort()
+
+    tracemalloc.start()
+    for text in texts:
+        style(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return OrderedDict([
+        ('texts', len(texts)),
+        ('ops_per_sec', len(texts) / best),
+        ('p50_us', _percentile(latencies, 0.5) * 1e6),
+        ('p99_us', _percentile(latencies, 0.99) * 1e6),
+        ('peak_kib', peak / 1024.0),
+    ])
+
+
+def run_child(backend, engines, workloads, scale, repeat):
+    """Run the benchmarks in this interpreter with the given backend"""
+    if backend == 're':
+        sys.modules['regex'] = None
+    import headLineStyle
+    if headLineStyle.REGEX_AVAILABLE != (backend == 'regex'):
+        return OrderedDict()
+    results = OrderedDict()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for engine in engines:
+            for name in workloads:
+                generate, count, wordlist_mode = WORKLOADS[name]
+                texts = generate(max(1, int(count * scale)))
+                style = _make_styler(headLineStyle, engine, wordlist_mode, tmpdir)
+                results['%s/%s/%s' % (backend, engine, name)] = measure(style, texts, repeat)
+    finally:
+        shutil.rmtree(tmpdir)
+    return results
+
+
+def run(backends, engines, workloads, scale=1.0, repeat=3):
+    """Run every backend in a separate interpreter and merge their results"""
+    results = OrderedDict()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for backend in backends:
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'benchmarks.run', '--child', backend,
+             '--engines', ','.join(engines), '--workloads', ','.join(workloads),
+             '--scale', str(scale), '--repeat', str(repeat)],
+            cwd=root, universal_newlines=True)
+        child_results = json.loads(output, object_pairs_hook=OrderedDict)
+        if not child_results:
+            sys.stderr.write('Skipping the %s backend, it is not installed\n' % backend)
+        results.update(child_results)
+    return results
+
+
+def report(results, baseline=None, out=sys.stdout):
+    header = '%-36s %12s %10s %10s %11s' % ('benchmark', 'ops/sec', 'p50 us', 'p99 us', 'peak KiB')
+    if baseline is not None:
+        header += ' %9s %9s' % ('ops x', 'p99 x')
+    out.write(header + '\n')
+    for key, result in results.items():
+        line = '%-36s %12.0f %10.1f %10.1f %11.1f' % (
+            key, result['ops_per_sec'], result['p50_us'], result['p99_us'], result['peak_kib'])
+        if baseline is not None:
+            base = baseline.get('results', {}).get(key)
+            if base:
+                line += ' %9.2f %9.2f' % (result['ops_per_sec'] / base['ops_per_sec'],
+                                          result['p99_us'] / base['p99_us'])
+        out.write(line + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help='Comma separated regex backends to run (%(default)s)')
+    parser.add_argument('--engines', default='classifier',
+                        help='Comma separated HeadlineStyler engines to run (%(default)s)')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help='Comma separated workloads to run (%(default)s)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplier for the number of texts of every workload')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of timed passes over every corpus')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare the results to a JSON file written by --save')
+    parser.add_argument('--child', choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    engines = args.engines.split(',')
+    workloads = args.workloads.split(',')
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error('Unknown workloads: %s' % ', '.join(sorted(unknown)))
+
+    if args.child:
+        json.dump(run_child(args.child, engines, workloads, args.scale, args.repeat), sys.stdout)
+        return
+
+    results = run(args.backends.split(','), engines, workloads, args.scale, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(OrderedDict([
+                ('python', platform.python_version()),
+                ('platform', platform.platform()),
+                ('results', results),
+            ]), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Thread scaling of headLineStyle.
+
+Styles the inputs of the ``TEST_DATA`` of the test suite from 1, 2, 4 and 8
+threads of a `ThreadPoolExecutor` at once, and reports the throughput of
+every thread count and its speedup over the first one, a single thread
+by default. With the GIL, threads only run at the same time while the
+regex backend releases it; on a free-threaded build of CPython the speedup
+should grow with the number of threads, up to the number of cores.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks.threads
+    python -m benchmarks.threads --threads 1,2,4,8,16 --passes 400 --shared
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from headLineStyle import HeadlineStyler, headLineStyle
+from headLineStyle.tests import TEST_DATA
+
+
+def run(style, texts, threads, passes):
+    """Style `texts` `passes` times in every one of `threads` threads, returning the elapsed time"""
+    def work():
+        for _ in range(passes):
+            for text in texts:
+                style(text)
+
+    with ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(work) for _ in range(threads)]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', default='1,2,4,8', help='Comma separated thread counts (%(default)s)')
+    parser.add_argument('--passes', type=int, default=200, help='Passes over the corpus by every thread')
+    parser.add_argument('--shared', action='store_true',
+                        help='Share one HeadlineStyler between the threads instead of calling headLineStyle')
+    args = parser.parse_args(argv)
+
+    texts = [input_text for input_text, _ in TEST_DATA]
+    style = HeadlineStyler().style if args.shared else headLineStyle
+    # Compile the patterns of the package before the first timed run
+    for text in texts:
+        style(text)
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('%d texts, GIL %s' % (len(texts), 'enabled' if gil else 'disabled'))
+    print('%8s %14s %9s' % ('threads', 'texts/sec', 'speedup'))
+    first = None
+    for threads in [int(threads) for threads in args.threads.split(',')]:
+        elapsed = run(style, texts, threads, args.passes)
+        rate = threads * args.passes * len(texts) / elapsed
+        if first is None:
+            first = rate
+        print('%8d %14.0f %8.2fx' % (threads, rate, rate / first))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,79 +6,1349 @@ Original Perl version by: Vinod Baste http://vinodbaste.com/ 11 Nov 2022
 License: http://www.opensource.org/licenses/mit-license.php
 """
 
-import argparse
-import logging
-
-logger = logging.getLogger(__name__)
+# Importing this module is kept cheap for short command line runs: argparse
+# and logging are only imported when needed, the regex backend is only
+# imported by `_load_backend` when the first styler is created, and every
+# pattern below is only compiled the first time it is used.
+import codecs
 import os
-import string
 import sys
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from functools import partial
+from itertools import chain
 
-try:
-    import regex
-except ImportError:
-    import re as regex
-
-    REGEX_AVAILABLE = False
-else:
-    REGEX_AVAILABLE = True
-
-__all__ = ['headLineStyle']
+__all__ = ['headLineStyle', 'headLineStyle_many', 'iter_headline_style', 'headline_style_edits', 'HeadlineStyler',
+           'Wordlist', 'HeadlineDocument', 'headline_style_series', 'headline_style_arrow']
 __version__ = '2.4.0'
 
 SMALL = r'a|an|and|as|at|but|by|en|for|if|in|of|on|or|the|to|v\.?|via|vs\.?'
 PUNCT = r"""!"“#$%&'‘()*+,\-–‒—―./:;?@[\\\]_`{|}~"""
 
-SMALL_WORDS = regex.compile(r'^(%s)$' % SMALL, regex.I)
+# A term with all consonants is considered an acronym
+CONSONANTS = 'bcdfghjklmnpqrstvwxz'
+# Every character matched by ALL_CONSONANTS, including the non-ASCII
+# characters that case-insensitively match an ASCII consonant
+CONSONANT_CHARS = frozenset(CONSONANTS + CONSONANTS.upper() + '\u017f\u212a')
+
+# Character sets of the ASCII fast path, see `_classify_ascii`; those that
+# depend on the backend are set by `_load_backend`
+_ASCII_LOWERCASE = frozenset('abcdefghijklmnopqrstuvwxyz')
+_ASCII_CONSONANT_CHARS = frozenset(CONSONANTS + CONSONANTS.upper())
+_HONORIFICS = frozenset(['mr', 'mrs', 'ms', 'dr'])
+
+_BACKEND_NAMES = frozenset(['regex', 'REGEX_AVAILABLE'])
+_backend_loaded = False
+_backend_lock = threading.Lock()
+
+# The ASCII characters matched by the letters of the patterns, which are
+# \p{Letter} with regex but \w with re, and by PUNCT
+_ASCII_LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_ASCII_WORD_CHARS = _ASCII_LETTERS | frozenset('0123456789_')
+_ASCII_PUNCT = '!"#$%&\'()*+,-./:;?@[\\]_`{|}~'
+
+
+def _load_backend():
+    """Import the regex backend, once"""
+    global _backend_loaded
+    global regex, REGEX_AVAILABLE
+    global _ASCII_CAPFIRST_CHARS, _ASCII_INLINE_CHARS, _ASCII_APOS_CHARS
+    if _backend_loaded:
+        return
+    with _backend_lock:
+        if _backend_loaded:
+            return
+        try:
+            import regex
+        except ImportError:
+            import re as regex
+
+            REGEX_AVAILABLE = False
+        else:
+            REGEX_AVAILABLE = True
+        # The characters of the ASCII fast path, see `_classify_ascii`
+        _ASCII_CAPFIRST_CHARS = _ASCII_INLINE_CHARS = _ASCII_APOS_CHARS = (
+            _ASCII_LETTERS if REGEX_AVAILABLE else _ASCII_WORD_CHARS)
+        _backend_loaded = True
+
+
+class _LazyPattern(object):
+    """
+    Stand-in for the module pattern `name`, which compiles it with the
+    regex backend on first use and puts it in its place in the module, so
+    that a pattern is only compiled by the calls that need it
+    """
+
+    def __init__(self, name, compile_pattern):
+        self.name = name
+        self._compile_pattern = compile_pattern
+        self._pattern = None
+
+    def compile(self):
+        if self._pattern is None:
+            _load_backend()
+            self._pattern = self._compile_pattern()
+            # Unless the module has been given another pattern since
+            if globals().get(self.name) is self:
+                globals()[self.name] = self._pattern
+        return self._pattern
+
+    def __getattr__(self, name):
+        # Introspection, e.g. by doctest or pickle, does not compile it
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.compile(), name)
+
+
+# Worst-case cost of the patterns, for a text, line or word of n characters
+# and a given list of small words, with either backend:
+#
+# LINE_BREAK(S), WORD_BREAK  O(n), a character class split on
+# SMALL_WORDS, MR_MRS_MS_DR  O(n), anchored at both ends
+# ALL_CONSONANTS             O(n), anchored at both ends
+# SMALL_FIRST                O(n), anchored; the leading punctuation is
+#                            given back one character at a time
+# SMALL_LAST                 O(n), every word boundary tries the small words
+# SUBPHRASE                  O(n) over a line, every position tries one
+#                            punctuation mark and a space
+# INLINE_PERIOD              O(n), three characters at every position
+# UC_ELSEWHERE, CAPFIRST     O(n), matched at the start of the word only;
+#                            the lazy punctuation prefix cannot overlap the
+#                            letters after it
+# APOS_SECOND, UC_INITIALS   O(n), anchored, and the alternatives of
+#                            UC_INITIALS cannot both go on after a letter
+# MAC_MC                     O(n) per match, but the rest of a Mc/Mac name is
+#                            styled again as a word, so a word of k "mc"
+#                            prefixes costs O(k * n) and recurses k deep
+#
+# The combined rules of `_compile_combined_rules` are a fixed number of the
+# above, or of O(n) patterns, tried at the start of the word. Styling is
+# therefore linear in the length of the text, but for the Mc/Mac rule, which
+# the ``max_word_length`` of `HeadlineStyler` bounds.
 
-SMALL_FIRST = regex.compile(r'^([%s]*)(%s)\b' % (PUNCT, SMALL), regex.I)
-SMALL_LAST = regex.compile(r'\b(%s)[%s]?$' % (SMALL, PUNCT), regex.I)
-SUBPHRASE = regex.compile(r'([:.;?!\-–‒—―][ ])(%s)' % SMALL)
-MAC_MC = regex.compile(r"^([Mm]c|MC)(\w.+)")
-MR_MRS_MS_DR = regex.compile(r"^((m((rs?)|s))|Dr)$", regex.I)
+LINE_BREAK = _LazyPattern('LINE_BREAK', lambda: regex.compile('[\r\n]'))
+LINE_BREAKS = _LazyPattern('LINE_BREAKS', lambda: regex.compile('[\r\n]+'))
+WORD_BREAK = _LazyPattern('WORD_BREAK', lambda: regex.compile('[\t ]'))
 
-if REGEX_AVAILABLE:
-    INLINE_PERIOD = regex.compile(r'[\p{Letter}][.][\p{Letter}]', regex.I)
-    UC_ELSEWHERE = regex.compile(r'[%s]*?[\p{Letter}]+[\p{Uppercase_Letter}]+?' % PUNCT)
-    CAPFIRST = regex.compile(r"^[%s]*?([\p{Letter}])" % PUNCT)
-    APOS_SECOND = regex.compile(r"^[dol]{1}['‘]{1}[\p{Letter}]+(?:['s]{2})?$", regex.I)
-    UC_INITIALS = regex.compile(
+SMALL_WORDS = _LazyPattern('SMALL_WORDS', lambda: _compile_small_word_patterns(SMALL)[0])
+SMALL_FIRST = _LazyPattern('SMALL_FIRST', lambda: _compile_small_word_patterns(SMALL)[1])
+SMALL_LAST = _LazyPattern('SMALL_LAST', lambda: _compile_small_word_patterns(SMALL)[2])
+SUBPHRASE = _LazyPattern('SUBPHRASE', lambda: _compile_small_word_patterns(SMALL)[3])
+ALL_CONSONANTS = _LazyPattern('ALL_CONSONANTS', lambda: regex.compile(r'\A[%s]+\Z' % CONSONANTS, regex.I))
+MAC_MC = _LazyPattern('MAC_MC', lambda: regex.compile(r"^([Mm]c|MC)(\w.+)"))
+MR_MRS_MS_DR = _LazyPattern('MR_MRS_MS_DR', lambda: regex.compile(r"^((m((rs?)|s))|Dr)$", regex.I))
+
+INLINE_PERIOD = _LazyPattern('INLINE_PERIOD', lambda: (
+    regex.compile(r'[\p{Letter}][.][\p{Letter}]', regex.I) if REGEX_AVAILABLE
+    else regex.compile(r'[\w][.][\w]', regex.I)))
+UC_ELSEWHERE = _LazyPattern('UC_ELSEWHERE', lambda: (
+    regex.compile(r'[%s]*?[\p{Letter}]+[\p{Uppercase_Letter}]+?' % PUNCT) if REGEX_AVAILABLE
+    else regex.compile(r'[%s]*?[a-zA-Z]+[A-Z]+?' % PUNCT)))
+CAPFIRST = _LazyPattern('CAPFIRST', lambda: (
+    regex.compile(r"^[%s]*?([\p{Letter}])" % PUNCT) if REGEX_AVAILABLE
+    else regex.compile(r"^[%s]*?([\w])" % PUNCT)))
+APOS_SECOND = _LazyPattern('APOS_SECOND', lambda: (
+    regex.compile(r"^[dol]{1}['‘]{1}[\p{Letter}]+(?:['s]{2})?$", regex.I) if REGEX_AVAILABLE
+    else regex.compile(r"^[dol]['‘][\w]+(?:['s]{2})?$", regex.I)))
+UC_INITIALS = _LazyPattern('UC_INITIALS', lambda: (
+    regex.compile(
         r"^(?:[\p{Uppercase_Letter}]{1}\.{1}|[\p{Uppercase_Letter}]{1}\.{1}[\p{Uppercase_Letter}]{1})+$")
-else:
-    INLINE_PERIOD = regex.compile(r'[\w][.][\w]', regex.I)
-    UC_ELSEWHERE = regex.compile(r'[%s]*?[a-zA-Z]+[A-Z]+?' % PUNCT)
-    CAPFIRST = regex.compile(r"^[%s]*?([\w])" % PUNCT)
-    APOS_SECOND = regex.compile(r"^[dol]['‘][\w]+(?:['s]{2})?$", regex.I)
-    UC_INITIALS = regex.compile(r"^(?:[A-Z]\.|[A-Z]\.[A-Z])+$")
+    if REGEX_AVAILABLE else regex.compile(r"^(?:[A-Z]\.|[A-Z]\.[A-Z])+$")))
+
+
+_logger = None
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        import logging
+        _logger = logging.getLogger(__name__)
+    return _logger
 
 
-class Immutable(object):
+def _debug_enabled():
+    # Nobody can have enabled debug logging if logging was never imported
+    logging = sys.modules.get('logging')
+    return logging is not None and _get_logger().isEnabledFor(logging.DEBUG)
+
+
+class _Immutable(object):
     pass
 
 
-class ImmutableString(str, Immutable):
+class _ImmutableString(str, _Immutable):
     pass
 
 
-class ImmutableBytes(bytes, Immutable):
+class _ImmutableBytes(bytes, _Immutable):
     pass
 
 
-def _mark_immutable(text):
-    if isinstance(text, bytes):
-        return ImmutableBytes(text)
-    return ImmutableString(text)
+# The classes that marked final words before they were kept as indices, left
+# for one release as deprecated aliases
+_DEPRECATED = {
+    'Immutable': _Immutable,
+    'ImmutableString': _ImmutableString,
+    'ImmutableBytes': _ImmutableBytes,
+}
+
+
+def __getattr__(name):
+    if name in _DEPRECATED:
+        import warnings
+        warnings.warn('headLineStyle.%s is deprecated and will be removed in the next release, styled words are '
+                      'no longer marked with it' % name, DeprecationWarning, stacklevel=2)
+        return _DEPRECATED[name]
+    if name in _BACKEND_NAMES:
+        _load_backend()
+        return globals()[name]
+    if name == 'logger':
+        return _get_logger()
+    if name in ('Wordlist', 'compile_wordlist'):
+        from . import wordlist
+        return getattr(wordlist, name)
+    if name == 'HeadlineDocument':
+        from .document import HeadlineDocument
+        return HeadlineDocument
+    if name in ('headline_style_series', 'headline_style_arrow'):
+        from . import columnar
+        return getattr(columnar, name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def _compile_small_word_patterns(small):
+    """Compile the patterns that depend on the list of small words"""
+    return (
+        regex.compile(r'^(%s)$' % small, regex.I),
+        regex.compile(r'^([%s]*)(%s)\b' % (PUNCT, small), regex.I),
+        regex.compile(r'\b(%s)[%s]?$' % (small, PUNCT), regex.I),
+        regex.compile(r'([:.;?!\-–‒—―][ ])(%s)' % small),
+    )
+
+
+def _upper_match(match):
+    return match.group(0).upper()
+
+
+def _capitalize_match(match):
+    return match.group(0).capitalize()
+
+
+def _capitalize_second_group(match):
+    return '%s%s' % (match.group(1), match.group(2).capitalize())
+
+
+def _is_all_caps(text):
+    """Return whether `text` is unchanged by upper casing"""
+    if text.isascii():
+        return _ASCII_LOWERCASE.isdisjoint(text)
+    return text.upper() == text
+
+
+# The functions below match the ASCII words that the pattern named in their
+# comment matches, with str methods and the ASCII character sets instead.
+
+def _is_ascii_initials(word):
+    # UC_INITIALS: upper case letters with one letter before the first
+    # period, one or two between periods and at most one after the last
+    parts = word.split('.')
+    if len(parts) < 2 or len(parts[0]) != 1 or len(parts[-1]) > 1:
+        return False
+    for part in parts[1:-1]:
+        if not 0 < len(part) < 3:
+            return False
+    letters = ''.join(parts)
+    return letters.isalpha() and letters.isupper()
+
+
+def _is_ascii_apos_second(word):
+    # APOS_SECOND, for a word of three or more characters with an
+    # apostrophe as its second character
+    if word[0] not in 'dolDOL':
+        return False
+    rest = word[2:]
+    if _ASCII_APOS_CHARS.issuperset(rest):
+        return True
+    return (len(rest) > 2 and rest[-2] in "'sS" and rest[-1] in "'sS"
+            and _ASCII_APOS_CHARS.issuperset(rest[:-2]))
+
+
+def _has_ascii_inline_period(word):
+    # INLINE_PERIOD
+    i = word.find('.', 1)
+    while 0 < i < len(word) - 1:
+        if word[i - 1] in _ASCII_INLINE_CHARS and word[i + 1] in _ASCII_INLINE_CHARS:
+            return True
+        i = word.find('.', i + 1)
+    return False
+
+
+def _is_ascii_mixed_case(word):
+    # UC_ELSEWHERE: after any leading punctuation, a run of letters with
+    # an upper case letter after its first letter
+    rest = word.lstrip(_ASCII_PUNCT)
+    if rest.isalpha():
+        return len(rest) > 1 and not rest[1:].islower()
+    for i, c in enumerate(rest):
+        if not c.isalpha():
+            return False
+        if i and c.isupper():
+            return True
+    return False
+
+
+def _ascii_capfirst(word):
+    # CAPFIRST.sub(_upper_match, word)
+    for i, c in enumerate(word):
+        if c in _ASCII_CAPFIRST_CHARS:
+            return word[:i] + c.upper() + word[i + 1:]
+        if c not in _ASCII_PUNCT:
+            break
+    return word
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class _LRUCache(object):
+    """Bounded, thread-safe least-recently-used mapping with hit/miss counters"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Last item of the word cache keys of the spellings returned by a callback
+_CALLBACK_KEY = 'callback'
+
+
+# Names of the rules that the "classifier" engine routes words to, and of
+# the groups of the pattern of the "combined" engine
+RULE_INITIALS = 'initials'
+RULE_APOS_SECOND = 'apos_second'
+RULE_MAC_MC = 'mac_mc'
+RULE_HONORIFIC = 'honorific'
+RULE_INLINE_PERIOD = 'inline_period'
+RULE_MIXED_CASE = 'mixed_case'
+RULE_SMALL = 'small'
+RULE_SLASH = 'slash'
+RULE_HYPHEN = 'hyphen'
+RULE_CONSONANTS = 'consonants'
+RULE_PLAIN = 'plain'
+
+ENGINES = ('classifier', 'cascade', 'combined')
+
+# Names of the other timings recorded by an instrumented styler
+STAT_CALLBACK = 'callback'
+STAT_SMALL_FIRST = 'small_first'
+STAT_SMALL_LAST = 'small_last'
+STAT_SUBPHRASE = 'subphrase'
+
+RuleStats = namedtuple('RuleStats', ['count', 'time'])
+
+
+class _RuleStats(object):
+    """Thread-safe call counts and cumulative times, by rule name"""
+
+    def __init__(self):
+        self._counts = {}
+        self._times = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, elapsed):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._times[name] = self._times.get(name, 0.0) + elapsed
+
+    def timed(self, name, func):
+        timer = time.perf_counter
+
+        def timed_func(*args):
+            start = timer()
+            result = func(*args)
+            self.add(name, timer() - start)
+            return result
+
+        return timed_func
+
+    def snapshot(self):
+        with self._lock:
+            return {name: RuleStats(count, self._times[name]) for name, count in self._counts.items()}
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._times.clear()
+
+
+class BatchResult(list):
+    """
+    List of styled texts returned by `headLineStyle_many`, in input order.
+    The ``unique`` attribute holds the number of distinct input texts that
+    were actually styled.
+    """
+    unique = 0
+
+
+def _embed(pattern):
+    """Return the source of a compiled pattern, with its ignore case flag inline"""
+    if pattern.flags & regex.I:
+        return '(?i:%s)' % pattern.pattern
+    return pattern.pattern
+
+
+def _compile_combined_rules(small_words, all_caps):
+    """
+    Compile the word rules of `_style_word_cascade`, for words of lines in
+    all caps or not, into one pattern of a named group per rule, in the
+    order of the cascade. The name of the group that matches a word is its
+    rule, and no match means `RULE_PLAIN`.
+
+    Every rule is the pattern of the cascade, or a pattern for its string
+    test, so the combined pattern matches the same words with both regex
+    backends.
+    """
+    rules = []
+    if all_caps:
+        rules.append((RULE_INITIALS, _embed(UC_INITIALS)))
+    rules.append((RULE_APOS_SECOND, _embed(APOS_SECOND)))
+    rules.append((RULE_MAC_MC, _embed(MAC_MC)))
+    rules.append((RULE_HONORIFIC, _embed(MR_MRS_MS_DR)))
+    # INLINE_PERIOD is searched for anywhere in the word
+    rules.append((RULE_INLINE_PERIOD, '.*?' + _embed(INLINE_PERIOD)))
+    if not all_caps:
+        rules.append((RULE_MIXED_CASE, _embed(UC_ELSEWHERE)))
+    rules.append((RULE_SMALL, _embed(small_words)))
+    rules.append((RULE_SLASH, '(?!.*//).*/'))
+    rules.append((RULE_HYPHEN, '.*-'))
+    # All consonants, but not a word as short as "St"
+    rules.append((RULE_CONSONANTS, '(?=.{3})' + _embed(ALL_CONSONANTS)))
+    return regex.compile('|'.join('(?P<%s>%s)' % rule for rule in rules))
+
+
+# Characters of a line styled between two checks of the timeout of a
+# styler without a maximum line length
+_TIMEOUT_CHUNK_LENGTH = 1024
+
+
+def _check_deadline(deadline, timeout):
+    if time.monotonic() > deadline:
+        raise TimeoutError('headLineStyle took longer than %s seconds' % timeout)
+
+
+def _merge_phrases(first, second, line):
+    """
+    Return the phrase spans of `line` found by `first`, and those found by
+    `second` that overlap none of them
+    """
+    spans = first(line)
+    if not spans:
+        return second(line)
+    extra = [span for span in second(line)
+             if not any(span[0] < end and start < span[1] for start, end, _ in spans)]
+    return sorted(spans + extra) if extra else spans
+
+
+def _chunk_end(line, start, length, spans, span_index):
+    """
+    Return the end of the chunk of `line` that starts at `start`: the last
+    word break within `length` characters, or else the first one after
+    them, moved past the phrase ``(start, end, phrase)`` `spans` from
+    `span_index` on that it falls into. The end of the line if there is none.
+    """
+    limit = start + length
+    if limit >= len(line):
+        return len(line)
+    end = max(line.rfind(' ', start, limit + 1), line.rfind('\t', start, limit + 1))
+    if end < start:
+        match = WORD_BREAK.search(line, limit)
+        end = match.start() if match else len(line)
+    while span_index < len(spans) and spans[span_index][0] <= end:
+        span_end = spans[span_index][1]
+        if span_end > end:
+            match = WORD_BREAK.search(line, span_end)
+            end = match.start() if match else len(line)
+        span_index += 1
+    return end
+
+
+def _encode_edits(data, edits):
+    """
+    Return the `edits` of the text that the UTF-8 `data` decodes to as
+    edits of `data`, with byte offsets and encoded replacements
+    """
+    if data.isascii():
+        return [(start, end, replacement.encode('utf-8')) for start, end, replacement in edits]
+    text = data.decode('utf-8', 'surrogateescape')
+    encoded = []
+    pos = data_pos = 0
+    for start, end, replacement in edits:
+        data_start = data_pos + len(text[pos:start].encode('utf-8', 'surrogateescape'))
+        data_pos = data_start + len(text[start:end].encode('utf-8', 'surrogateescape'))
+        pos = end
+        encoded.append((data_start, data_pos, replacement.encode('utf-8', 'surrogateescape')))
+    return encoded
+
+
+def _diff_line(line, styled, offset, edits):
+    """
+    Append the edits from `line`, at `offset` of the text, to its styled
+    version `styled`. When styling kept the length of the line, which it
+    does unless a word changed length, every run of changed characters is
+    an edit of its own, otherwise the line is one edit without the prefix
+    and suffix it has in common with its styled version.
+    """
+    if line == styled:
+        return
+    if len(line) == len(styled):
+        start = None
+        for i, (char, new_char) in enumerate(zip(line, styled)):
+            if char != new_char:
+                if start is None:
+                    start = i
+            elif start is not None:
+                edits.append((offset + start, offset + i, styled[start:i]))
+                start = None
+        if start is not None:
+            edits.append((offset + start, offset + len(line), styled[start:]))
+        return
+    prefix = 0
+    limit = min(len(line), len(styled))
+    while prefix < limit and line[prefix] == styled[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and line[-1 - suffix] == styled[-1 - suffix]:
+        suffix += 1
+    edits.append((offset + prefix, offset + len(line) - suffix, styled[prefix:len(styled) - suffix]))
+
+
+def _freeze_overrides(overrides):
+    """Return the `Wordlist` of the overrides of a `HeadlineStyler`, or None"""
+    if overrides is None:
+        return None
+    from .wordlist import Wordlist
+    if isinstance(overrides, Wordlist):
+        return overrides
+    if hasattr(overrides, 'items'):
+        # Words of several words are phrases, which are found in the text in
+        # any case and replaced by their spelling
+        phrases = []
+        words = {}
+        for word, spelling in overrides.items():
+            if len(word.split()) > 1:
+                if ' '.join(word.split()).upper() != ' '.join(spelling.split()).upper():
+                    raise ValueError('The spelling %r of the phrase %r has other words' % (spelling, word))
+                phrases.append(spelling)
+            else:
+                words[word.strip().upper()] = spelling
+        wordlist = Wordlist(phrases)
+        wordlist.words = words
+        return wordlist
+    return Wordlist(overrides)
+
+
+class HeadlineStyler(object):
+    """
+    Reusable headLineStyle engine.
+
+    The small word patterns and the callback are bound once at construction
+    time, and an instance holds no per-call state, so a single styler can be
+    shared between threads and reused for every call with the same
+    configuration. This holds without the GIL too, on free-threaded builds
+    of CPython: the only state shared by calls is the word cache and the
+    counters of `stats`, which are locked.
+
+    >>> styler = HeadlineStyler(small='a|an|the|with')
+    >>> styler.style('playing the game "words with friends"')
+    'Playing the Game "Words with Friends"'
+    """
+
+    def __init__(self, small=SMALL, callback=None, small_first_last=True, preserve_blank_lines=False,
+                 word_cache_size=None, engine='classifier', instrument=False, overrides=None,
+                 max_line_length=None, max_word_length=None, timeout=None):
+        """
+        :param small: Regex alternation of the small words that are not capitalized
+        :param callback: Callback function that returns the headLineStyle version of a specific word
+        :param small_first_last: Capitalize small words (e.g. 'A') at the beginning
+        :param preserve_blank_lines: preserve the blank lines
+        :param word_cache_size: Number of styled words to memoize, None disables the cache
+        :param engine: How words are matched against the rules, one of `ENGINES`
+        :param instrument: Count and time every rule, see `stats`
+        :param overrides: Canonical spellings of words, see below
+        :param max_line_length: Style longer lines in chunks of at most this many characters
+        :param max_word_length: Leave longer words as they are
+        :param timeout: Seconds after which a call raises `TimeoutError`
+        :type small: str
+        :type callback: function
+        :type small_first_last: bool
+        :type preserve_blank_lines: bool
+        :type word_cache_size: int
+        :type engine: str
+        :type instrument: bool
+        :type overrides: Wordlist, dict or iterable
+        :type max_line_length: int
+        :type max_word_length: int
+        :type timeout: float
+
+        With a word cache, the callback must return the same result every
+        time it is called with the same word.
+
+        `overrides` is looked up by the styler itself, without calling back
+        into Python for every word, and is checked before the callback. It
+        is either a `Wordlist`, a dict of words to their canonical spelling,
+        or the entries of a `Wordlist`, e.g. ``['TCP', 'iPhone']``. The
+        words of a dict are matched case-insensitively, keys of several
+        words are phrases whose spelling differs only in case, and the overrides
+        are copied at construction time, except for a `Wordlist`, which is
+        used as it is and must not be changed afterwards.
+
+        The limits bound the time and memory that untrusted text takes to
+        style. A line longer than `max_line_length` is styled in chunks
+        that end at a word break, with the same result as a whole, and a
+        word longer than `max_word_length` is neither styled nor given to
+        the callback. The time of a call is checked against `timeout`
+        before every line and chunk; without a maximum line length, lines
+        are styled in chunks of 1024 characters for this. As every rule
+        takes linear time in the length of a word but the Mc/Mac one, which
+        styles the rest of the word again, a maximum word length bounds the
+        time spent on every chunk.
+        """
+        _load_backend()
+        self.small = small
+        self.callback = callback
+        self.overrides = _freeze_overrides(overrides)
+        # The words of the overrides are looked up by their upper case form
+        self._override_words = self.overrides.words if self.overrides else None
+        self._override_phrases = self.overrides.find_phrases if self.overrides and self.overrides.phrases else None
+        self.small_first_last = small_first_last
+        self.preserve_blank_lines = preserve_blank_lines
+        (self.small_words, self.small_first,
+         self.small_last, self.subphrase) = _compile_small_word_patterns(small)
+        for name, limit in (('max_line_length', max_line_length), ('max_word_length', max_word_length),
+                            ('timeout', timeout)):
+            if limit is not None and limit <= 0:
+                raise ValueError('%s must be positive, got %r' % (name, limit))
+        self.max_line_length = max_line_length
+        self.max_word_length = max_word_length
+        self.timeout = timeout
+        # Lines longer than this, if any, are styled by `_style_long_line`
+        limits = [limit for limit in (max_line_length, max_word_length) if limit is not None]
+        if timeout is not None and max_line_length is None:
+            limits.append(_TIMEOUT_CHUNK_LENGTH)
+        self._bound = min(limits) if limits else None
+        self.word_cache_size = word_cache_size
+        self._word_cache = _LRUCache(word_cache_size) if word_cache_size else None
+        # The "cascade" engine tries every rule regex in turn, and is kept
+        # as the reference implementation for the other engines. The
+        # "combined" engine matches a word against all rules at once.
+        if engine == 'classifier':
+            self._style_word = self._style_word_classified
+        elif engine == 'cascade':
+            self._style_word = self._style_word_cascade
+        elif engine == 'combined':
+            self._style_word = self._style_word_combined
+            self._rules = _compile_combined_rules(self.small_words, False)
+            self._rules_all_caps = _compile_combined_rules(self.small_words, True)
+        else:
+            raise ValueError('Unknown engine %r, expected one of %s' % (engine, ', '.join(ENGINES)))
+        self.engine = engine
+        self._fix_small_first = partial(self.small_first.sub, _capitalize_second_group)
+        self._fix_small_last = partial(self.small_last.sub, _capitalize_match)
+        self._fix_subphrases = partial(self.subphrase.sub, _capitalize_second_group)
+        # Instrumentation swaps in timed versions of the above, so that an
+        # uninstrumented styler does not pay for it
+        self._stats = None
+        if instrument:
+            if engine != 'classifier':
+                raise ValueError('Instrumentation needs the rules of the classifier engine')
+            self._stats = _RuleStats()
+            self._style_word = self._style_word_instrumented
+            self._fix_small_first = self._stats.timed(STAT_SMALL_FIRST, self._fix_small_first)
+            self._fix_small_last = self._stats.timed(STAT_SMALL_LAST, self._fix_small_last)
+            self._fix_subphrases = self._stats.timed(STAT_SUBPHRASE, self._fix_subphrases)
+
+    def __repr__(self):
+        return '%s(small=%r, callback=%r)' % (type(self).__name__, self.small, self.callback)
+
+    def style(self, text):
+        """headLineStyle the given text using this styler's configuration"""
+        return self._style(text, self.callback, self.small_first_last, self.preserve_blank_lines)
+
+    __call__ = style
+
+    def style_many(self, texts):
+        """
+        headLineStyle every text of an iterable, see `headLineStyle_many`
+        """
+        return self._style_many(texts, self.callback, self.small_first_last, self.preserve_blank_lines)
+
+    def iter_style(self, lines):
+        """
+        headLineStyle an iterable of lines lazily, see `iter_headline_style`
+        """
+        return self._iter_style(lines, self.callback, self.small_first_last, self.preserve_blank_lines)
+
+    def style_edits(self, text):
+        """
+        Return the changes that style the given text as ``(start, end,
+        replacement)`` edits, see `headline_style_edits`
+        """
+        return self._style_edits(text, self.callback, self.small_first_last, self.preserve_blank_lines)
+
+    def document(self, text=''):
+        """
+        Return a `HeadlineDocument` of `text` styled with this styler's
+        configuration, which only styles the lines changed by its edits
+        """
+        from .document import HeadlineDocument
+        return HeadlineDocument(text, self.callback, self.small_first_last, self.preserve_blank_lines, styler=self)
+
+    def _style(self, text, callback, small_first_last, preserve_blank_lines):
+        if isinstance(text, bytes):
+            # Undecodable bytes are kept as they are through surrogates
+            text = text.decode('utf-8', 'surrogateescape')
+            result = self._style(text, callback, small_first_last, preserve_blank_lines)
+            return result.encode('utf-8', 'surrogateescape')
+        result = self._style_text(text, callback, small_first_last, preserve_blank_lines)
+        if _debug_enabled():
+            _get_logger().debug(result)
+        return result
+
+    def _style_many(self, texts, callback, small_first_last, preserve_blank_lines):
+        style_text = self._style_text
+        styled = {}
+        results = BatchResult()
+        append = results.append
+        for text in texts:
+            try:
+                append(styled[text])
+            except KeyError:
+                if isinstance(text, bytes):
+                    result = self._style(text, callback, small_first_last, preserve_blank_lines)
+                else:
+                    result = style_text(text, callback, small_first_last, preserve_blank_lines)
+                styled[text] = result
+                append(result)
+        results.unique = len(styled)
+        if _debug_enabled():
+            _get_logger().debug('Styled %d texts, %d unique', len(results), results.unique)
+        return results
+
+    def _iter_style(self, chunks, callback, small_first_last, preserve_blank_lines):
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            return
+        chunks = chain([first], chunks)
+        if isinstance(first, bytes):
+            # Characters split between two chunks are decoded as a whole
+            decode = codecs.getincrementaldecoder('utf-8')('surrogateescape').decode
+            texts = chain((decode(chunk) for chunk in chunks), [decode(b'', True)])
+            for line in self._iter_style(texts, callback, small_first_last, preserve_blank_lines):
+                yield line.encode('utf-8', 'surrogateescape')
+            return
+        style_text = self._style_text
+        for line, line_break in _iter_lines(chunks, preserve_blank_lines):
+            yield style_text(line, callback, small_first_last, preserve_blank_lines) + line_break
+
+    def _style_edits(self, text, callback, small_first_last, preserve_blank_lines):
+        if isinstance(text, bytes):
+            return _encode_edits(text, self._style_edits(text.decode('utf-8', 'surrogateescape'), callback,
+                                                         small_first_last, preserve_blank_lines))
+        style_text = self._style_text
+        line_break = LINE_BREAK if preserve_blank_lines else LINE_BREAKS
+        edits = []
+        start = 0
+        for match in line_break.finditer(text):
+            line = text[start:match.start()]
+            _diff_line(line, style_text(line, callback, small_first_last, False), start, edits)
+            if match.group() != '\n':
+                edits.append((match.start(), match.end(), '\n'))
+            start = match.end()
+        line = text[start:]
+        _diff_line(line, style_text(line, callback, small_first_last, False), start, edits)
+        return edits
+
+    def _style_text(self, text, callback, small_first_last, preserve_blank_lines):
+        if preserve_blank_lines:
+            lines = LINE_BREAK.split(text)
+        else:
+            lines = LINE_BREAKS.split(text)
+        if self._word_cache is None:
+            style_word = self._style_word
+        else:
+            style_word = self._style_word_cached
+        # The phrases of the overrides win over those of a Wordlist callback
+        find_phrases = self._override_phrases
+        if getattr(callback, 'find_phrases', None) is not None and getattr(callback, 'phrases', True):
+            if find_phrases is None:
+                find_phrases = callback.find_phrases
+            else:
+                find_phrases = partial(_merge_phrases, find_phrases, callback.find_phrases)
+        # Lines longer than `_bound` go through `_style_long_line`, which
+        # applies the limits of the styler
+        bound = self._bound
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        processed = []
+        for line in lines:
+            if bound is not None:
+                if deadline is not None:
+                    _check_deadline(deadline, self.timeout)
+                if len(line) > bound:
+                    processed.append(self._style_long_line(line, callback, small_first_last, style_word,
+                                                           find_phrases, deadline))
+                    continue
+            tc_line, finals = self._style_line_words(line, _is_all_caps(line), callback, style_word, find_phrases)
+
+            if small_first_last and tc_line:
+                if 0 not in finals:
+                    tc_line[0] = self._fix_small_first(tc_line[0])
+
+                if len(tc_line) - 1 not in finals:
+                    tc_line[-1] = self._fix_small_last(tc_line[-1])
+
+            result = " ".join(tc_line)
+
+            result = self._fix_subphrases(result)
+
+            processed.append(result)
+
+        return "\n".join(processed)
+
+    def _style_line_words(self, line, all_caps, callback, style_word, find_phrases, spans=None,
+                          max_word_length=None):
+        """
+        Split a line into words and style them, returning the words styled
+        and the indices of those whose spelling is final. The phrases of the
+        line are found with `find_phrases`, or else given as `spans`. Words
+        longer than `max_word_length` are final as they are.
+        """
+        ascii_words = line.isascii() and '\t' not in line
+        if ascii_words:
+            words = line.split(' ')
+        else:
+            words = WORD_BREAK.split(line)
+        # The indices of the words whose spelling is final, given by the
+        # overrides, the callback or a phrase, are kept next to the words so
+        # that the small word fixups leave them alone
+        if find_phrases is not None and len(words) > 1:
+            spans = find_phrases(line)
+        if spans:
+            return self._style_words_around(words, spans, all_caps, callback, style_word, max_word_length)
+        override_words = self._override_words
+        if override_words is not None or callback or max_word_length is not None:
+            keys = None
+            if override_words is not None:
+                # The upper case form of every word is split out of the
+                # upper case line, rather than made a word at a time
+                if all_caps:
+                    keys = words
+                elif ascii_words:
+                    keys = line.upper().split(' ')
+                else:
+                    keys = [word.upper() for word in words]
+            return self._style_words(words, keys, all_caps, callback, style_word, max_word_length)
+        return [style_word(word, all_caps, callback) for word in words], ()
+
+    def _style_long_line(self, line, callback, small_first_last, style_word, find_phrases, deadline):
+        """
+        Style a line longer than the limits of the styler, the same as
+        `_style_text` does, a chunk of at most `max_line_length` characters
+        at a time. Chunks end at a word break outside of any phrase, so
+        that only the small word fixups and the subphrase fixup see more
+        than one chunk: the former apply to the first word of the first
+        chunk and the last word of the last one, and the latter is given
+        the end of the previous chunk before every chunk.
+        """
+        all_caps = _is_all_caps(line)
+        spans = []
+        if find_phrases is not None and WORD_BREAK.search(line):
+            spans = find_phrases(line)
+        chunk_length = self.max_line_length or _TIMEOUT_CHUNK_LENGTH
+        # The ends of the subphrase fixups of the chunk last styled
+        ends = []
+
+        def fix_subphrase(match):
+            ends.append(match.end())
+            return _capitalize_second_group(match)
+
+        fix_subphrases = partial(self.subphrase.sub, fix_subphrase)
+        if self._stats is not None:
+            fix_subphrases = self._stats.timed(STAT_SUBPHRASE, fix_subphrases)
+        context = ''
+        span_index = 0
+        start = 0
+        results = []
+        while True:
+            if deadline is not None and start:
+                _check_deadline(deadline, self.timeout)
+            end = _chunk_end(line, start, chunk_length, spans, span_index)
+            chunk_spans = []
+            while span_index < len(spans) and spans[span_index][0] < end:
+                span_start, span_end, phrase = spans[span_index]
+                chunk_spans.append((span_start - start, span_end - start, phrase))
+                span_index += 1
+            tc_line, finals = self._style_line_words(line[start:end], all_caps, callback, style_word, None,
+                                                     chunk_spans, self.max_word_length)
+            if small_first_last:
+                if not start and 0 not in finals:
+                    tc_line[0] = self._fix_small_first(tc_line[0])
+                if end == len(line) and len(tc_line) - 1 not in finals:
+                    tc_line[-1] = self._fix_small_last(tc_line[-1])
+            result = context + " ".join(tc_line)
+            del ends[:]
+            fixed = fix_subphrases(result)
+            results.append(fixed[len(context):])
+            if end == len(line):
+                return " ".join(results)
+            # A subphrase fixup across the word break starts with the last
+            # character of this chunk, unless a fixup ended there already
+            context = '' if ends and ends[-1] == len(result) else result[-1:] + ' '
+            start = end + 1
+
+    def _style_words(self, words, keys, all_caps, callback, style_word, max_word_length=None):
+        """
+        Style the words of a line that may have a final spelling, in the
+        overrides under their upper case `keys` or from the callback.
+        Return the words styled and the indices of the final ones.
+        """
+        get = self._override_words.get if keys is not None else None
+        tc_line = []
+        finals = []
+        for i, word in enumerate(words):
+            if max_word_length is not None and len(word) > max_word_length:
+                new_word = word
+            else:
+                new_word = get(keys[i]) if get is not None else None
+                if not new_word and callback:
+                    new_word = self._call_back(callback, word, all_caps)
+            if new_word:
+                finals.append(i)
+            else:
+                new_word = style_word(word, all_caps, callback)
+            tc_line.append(new_word)
+        return tc_line, finals
+
+    def _style_words_around(self, words, spans, all_caps, callback, style_word, max_word_length=None):
+        """
+        Style the words of a line, except for the ``(start, end, phrase)``
+        spans of the line, which are replaced by their phrase. Return the
+        words styled and the indices of the final ones, which are those
+        overlapping a span as well, unless letters or digits of the word
+        lie outside of the span, e.g. "brand-" in "brand-new york". The
+        parts of a word outside of the spans are styled as the parts of a
+        hyphenated word.
+        """
+        tc_line = []
+        finals = []
+        spans = iter(spans)
+        start, end, phrase = next(spans)
+        pos = 0
+        for i, word in enumerate(words):
+            word_end = pos + len(word)
+            if start is None or word_end <= start:
+                if max_word_length is not None and len(word) > max_word_length:
+                    new_word = word
+                else:
+                    new_word = self._final_spelling(word, all_caps, callback)
+                if new_word:
+                    finals.append(i)
+                else:
+                    new_word = style_word(word, all_caps, callback)
+                tc_line.append(new_word)
+            else:
+                # Long words are left as they are outside of the spans too
+                style_parts = max_word_length is None or len(word) <= max_word_length
+                final = True
+                pieces = []
+                cursor = pos
+                while True:
+                    part = word[cursor - pos:max(cursor, start) - pos if start is not None else None]
+                    if style_parts and any(c.isalnum() for c in part):
+                        part = self._style_fragment(part, callback, False)
+                        final = False
+                    pieces.append(part)
+                    if start is None or start >= word_end:
+                        break
+                    overlap_start = max(cursor, start)
+                    overlap_end = min(word_end, end)
+                    pieces.append(phrase[overlap_start - start:overlap_end - start])
+                    cursor = overlap_end
+                    if end > word_end:
+                        break
+                    start, end, phrase = next(spans, (None, None, None))
+                tc_line.append(''.join(pieces))
+                if final:
+                    finals.append(i)
+            # Words are separated by a single space or tab
+            pos = word_end + 1
+        return tc_line, finals
+
+    def _final_spelling(self, word, all_caps, callback):
+        """
+        Return the spelling of a word in the overrides, or else the one
+        returned by the callback, which is final, or None
+        """
+        if self._override_words is not None:
+            new_word = self._override_words.get(word.upper())
+            if new_word:
+                return new_word
+        if callback:
+            # Address #22: If a callback has done something
+            # specific, leave this string alone from now on
+            return self._call_back(callback, word, all_caps) or None
+        return None
+
+    def _call_back(self, callback, word, all_caps):
+        """
+        Return the spelling that the callback returns for a word, memoized
+        by the word cache, if any, under a key of its own, since a final
+        spelling is not the result of `_style_word`
+        """
+        if self._word_cache is None:
+            return self._call_back_uncached(callback, word, all_caps)
+        key = (word, all_caps, callback, _CALLBACK_KEY)
+        new_word = self._word_cache.get(key)
+        if new_word is None:
+            # Words the callback has no spelling for are cached as ''
+            new_word = self._call_back_uncached(callback, word, all_caps) or ''
+            self._word_cache.put(key, new_word)
+        return new_word
+
+    def _call_back_uncached(self, callback, word, all_caps):
+        if self._stats is None:
+            return callback(word, all_caps=all_caps)
+        start = time.perf_counter()
+        new_word = callback(word, all_caps=all_caps)
+        self._stats.add(STAT_CALLBACK, time.perf_counter() - start)
+        return new_word
+
+    def _style_fragment(self, fragment, callback, small_first_last):
+        """
+        Style a part of a compound word, i.e. a part of a hyphenated or
+        slashed word or what follows the prefix of a Mc/Mac name, the same
+        as `_style_text` styles it as a text of its own, without splitting
+        it into lines and words again. A fragment is in all caps on its own,
+        and has no spaces for the subphrase fixup to apply to.
+        """
+        all_caps = _is_all_caps(fragment)
+        new_word = self._final_spelling(fragment, all_caps, callback)
+        if new_word:
+            return new_word
+        if self._word_cache is None:
+            new_word = self._style_word(fragment, all_caps, callback)
+        else:
+            new_word = self._style_word_cached(fragment, all_caps, callback)
+        if small_first_last:
+            new_word = self._fix_small_last(self._fix_small_first(new_word))
+        return new_word
+
+    def _style_word_cached(self, word, all_caps, callback):
+        # Only the word itself is memoized: the small word fixups for the
+        # first and last word of a line are applied by `_style` afterwards.
+        key = (word, all_caps, callback)
+        new_word = self._word_cache.get(key)
+        if new_word is None:
+            new_word = self._style_word(word, all_caps, callback)
+            self._word_cache.put(key, new_word)
+        return new_word
+
+    def _classify(self, word, all_caps):
+        """
+        Find the rule that applies to a word, returning its name and the
+        rule's match object, if it has one.
+
+        The characters of the word are scanned once, and a rule regex is
+        only run to confirm a rule whose characters are present, so a plain
+        word is routed without trying the whole cascade. The rules are
+        checked in the same order as `_style_word_cascade`.
+        """
+        chars = set(word)
+        if all_caps and '.' in chars and UC_INITIALS.match(word):
+            return RULE_INITIALS, None
+        if len(word) > 2 and word[1] in "'‘" and APOS_SECOND.match(word):
+            return RULE_APOS_SECOND, None
+        if word[:2] in ('Mc', 'mc', 'MC'):
+            match = MAC_MC.match(word)
+            if match:
+                return RULE_MAC_MC, match
+        if 1 < len(word) < 4 and MR_MRS_MS_DR.match(word):
+            return RULE_HONORIFIC, None
+        if '.' in chars and INLINE_PERIOD.search(word):
+            return RULE_INLINE_PERIOD, None
+        # A word without upper case letters cannot match UC_ELSEWHERE
+        if not all_caps and not word.islower() and UC_ELSEWHERE.match(word):
+            return RULE_MIXED_CASE, None
+        if self.small_words.match(word):
+            return RULE_SMALL, None
+        if '/' in chars and '//' not in word:
+            return RULE_SLASH, None
+        if '-' in chars:
+            return RULE_HYPHEN, None
+        # Lower casing an all caps word keeps its length and consonants
+        if len(word) > 2 and chars <= CONSONANT_CHARS:
+            return RULE_CONSONANTS, None
+        return RULE_PLAIN, None
+
+    def _classify_ascii(self, word, all_caps):
+        """
+        `_classify` for ASCII words, which checks the rules with str methods
+        and precomputed character sets instead of Unicode property patterns
+        """
+        if all_caps and '.' in word and _is_ascii_initials(word):
+            return RULE_INITIALS, None
+        if len(word) > 2 and word[1] == "'" and _is_ascii_apos_second(word):
+            return RULE_APOS_SECOND, None
+        if word[:2] in ('Mc', 'mc', 'MC'):
+            match = MAC_MC.match(word)
+            if match:
+                return RULE_MAC_MC, match
+        if 1 < len(word) < 4 and word.lower() in _HONORIFICS:
+            return RULE_HONORIFIC, None
+        if '.' in word and _has_ascii_inline_period(word):
+            return RULE_INLINE_PERIOD, None
+        if not all_caps and not word.islower() and _is_ascii_mixed_case(word):
+            return RULE_MIXED_CASE, None
+        if self.small_words.match(word):
+            return RULE_SMALL, None
+        if '/' in word and '//' not in word:
+            return RULE_SLASH, None
+        if '-' in word:
+            return RULE_HYPHEN, None
+        if len(word) > 2 and _ASCII_CONSONANT_CHARS.issuperset(word):
+            return RULE_CONSONANTS, None
+        return RULE_PLAIN, None
+
+    def _style_word_classified(self, word, all_caps, callback):
+        if word.isascii():
+            rule, match = self._classify_ascii(word, all_caps)
+        else:
+            rule, match = self._classify(word, all_caps)
+        return self._apply_rule(rule, match, word, all_caps, callback)
+
+    def _style_word_instrumented(self, word, all_caps, callback):
+        # Same as `_style_word_classified`, timing the rule. The time of
+        # the compound rules includes the time spent on their parts, which
+        # are counted under their own rules as well.
+        timer = time.perf_counter
+        start = timer()
+        if word.isascii():
+            rule, match = self._classify_ascii(word, all_caps)
+        else:
+            rule, match = self._classify(word, all_caps)
+        new_word = self._apply_rule(rule, match, word, all_caps, callback)
+        self._stats.add(rule, timer() - start)
+        return new_word
+
+    def _apply_rule(self, rule, match, word, all_caps, callback):
+        if rule == RULE_PLAIN:
+            if all_caps:
+                word = word.lower()
+            if word[:1].isalpha():
+                return word[0].upper() + word[1:]
+            if word.isascii():
+                return _ascii_capfirst(word)
+            return CAPFIRST.sub(_upper_match, word)
+        if rule == RULE_SMALL:
+            return word.lower()
+        if rule == RULE_HYPHEN:
+            return "-".join([self._style_fragment(t, callback, False) for t in word.split('-')])
+        if rule == RULE_SLASH:
+            return "/".join([self._style_fragment(t, callback, False) for t in word.split('/')])
+        if rule == RULE_CONSONANTS:
+            if all_caps:
+                word = word.lower()
+            return word.upper()
+        if rule == RULE_MAC_MC:
+            return "%s%s" % (match.group(1).capitalize(),
+                             self._style_fragment(match.group(2), callback, True))
+        if rule == RULE_APOS_SECOND:
+            if word[0] not in 'aeiouAEIOU':
+                return word[0].lower() + word[1] + word[2].upper() + word[3:]
+            return word[0].upper() + word[1] + word[2].upper() + word[3:]
+        if rule == RULE_HONORIFIC:
+            return word[0].upper() + word[1:]
+        # RULE_INITIALS, RULE_INLINE_PERIOD and RULE_MIXED_CASE
+        return word
+
+    def _style_word_combined(self, word, all_caps, callback):
+        match = (self._rules_all_caps if all_caps else self._rules).match(word)
+        if match is None:
+            return self._apply_rule(RULE_PLAIN, None, word, all_caps, callback)
+        rule = match.lastgroup
+        if rule == RULE_MAC_MC:
+            # The groups of the prefix and the rest are those of MAC_MC
+            match = MAC_MC.match(word)
+        return self._apply_rule(rule, match, word, all_caps, callback)
+
+    def _style_word_cascade(self, word, all_caps, callback):
+        if all_caps:
+            if UC_INITIALS.match(word):
+                return word
+
+        if APOS_SECOND.match(word):
+            if len(word[0]) == 1 and word[0] not in 'aeiouAEIOU':
+                return word[0].lower() + word[1] + word[2].upper() + word[3:]
+            return word[0].upper() + word[1] + word[2].upper() + word[3:]
+
+        match = MAC_MC.match(word)
+        if match:
+            return "%s%s" % (match.group(1).capitalize(),
+                             self._style_fragment(match.group(2), callback, True))
+
+        if MR_MRS_MS_DR.match(word):
+            return word[0].upper() + word[1:]
+
+        if INLINE_PERIOD.search(word) or (not all_caps and UC_ELSEWHERE.match(word)):
+            return word
+
+        if self.small_words.match(word):
+            return word.lower()
+
+        if "/" in word and "//" not in word:
+            return "/".join([self._style_fragment(t, callback, False) for t in word.split('/')])
+
+        if '-' in word:
+            return "-".join([self._style_fragment(t, callback, False) for t in word.split('-')])
+
+        if all_caps:
+            word = word.lower()
+
+        # A term with all consonants should be considered an acronym.  But if it's
+        # too short (like "St", don't apply this)
+        if len(word) > 2 and ALL_CONSONANTS.search(word):
+            return word.upper()
+
+        # Just a normal word that needs to be capitalized
+        return CAPFIRST.sub(_upper_match, word)
+
+    def cache_info(self):
+        """
+        Return the hit/miss statistics of the word cache as a `CacheInfo`
+        tuple, or None if the styler was created without a word cache.
+        """
+        if self._word_cache is None:
+            return None
+        return self._word_cache.info()
+
+    def cache_clear(self):
+        """Empty the word cache and reset its statistics"""
+        if self._word_cache is not None:
+            self._word_cache.clear()
+
+    def stats(self):
+        """
+        Return how often each rule, the callback and the line level small
+        word fixups ran, and the cumulative time they took, as a dict of
+        name to `RuleStats`. Returns None unless the styler was created
+        with ``instrument=True``.
+
+        >>> styler = HeadlineStyler(instrument=True)
+        >>> styler.style('the mcdonald-smith report')
+        'The McDonald-Smith Report'
+        >>> stats = styler.stats()
+        >>> stats['hyphen'].count, stats['mac_mc'].count, stats['plain'].count
+        (1, 1, 3)
+        """
+        if self._stats is None:
+            return None
+        return self._stats.snapshot()
+
+    def stats_clear(self):
+        """Reset the counters of an instrumented styler"""
+        if self._stats is not None:
+            self._stats.clear()
+
+
+# The styler of `headLineStyle`, created on first use. Changes of the
+# configuration replace it as a whole, under `_config_lock`, and every call
+# looks it up once, so a call in progress keeps the styler it started with.
+_default_styler = None
+_config_lock = threading.RLock()
+
+
+def _get_default_styler():
+    global _default_styler
+    styler = _default_styler
+    if styler is None:
+        with _config_lock:
+            if _default_styler is None:
+                _default_styler = HeadlineStyler()
+            styler = _default_styler
+    return styler
 
 
 def set_small_word_list(small=SMALL):
+    """
+    Replace the list of small words used by `headLineStyle`.
+
+    Calling it without arguments restores the default list. Calls of
+    `headLineStyle` already in progress in other threads finish with the
+    previous list. A styler with its own small word list can be created
+    with `HeadlineStyler` instead, which leaves the module-level
+    configuration untouched.
+    """
     global SMALL_WORDS
     global SMALL_FIRST
     global SMALL_LAST
     global SUBPHRASE
-    SMALL_WORDS = regex.compile(r'^(%s)$' % small, regex.I)
-    SMALL_FIRST = regex.compile(r'^([%s]*)(%s)\b' % (PUNCT, small), regex.I)
-    SMALL_LAST = regex.compile(r'\b(%s)[%s]?$' % (small, PUNCT), regex.I)
-    SUBPHRASE = regex.compile(r'([:.;?!][ ])(%s)' % small)
+    global _default_styler
+    with _config_lock:
+        styler = HeadlineStyler(small, word_cache_size=_get_default_styler().word_cache_size)
+        SMALL_WORDS, SMALL_FIRST, SMALL_LAST, SUBPHRASE = (
+            styler.small_words, styler.small_first, styler.small_last, styler.subphrase)
+        _default_styler = styler
+
+
+def set_word_cache_size(maxsize=None):
+    """
+    Memoize up to `maxsize` styled words in `headLineStyle`, keyed on the
+    word, whether its line is in all caps and the callback. Passing None
+    disables the cache again.
+    """
+    global _default_styler
+    with _config_lock:
+        _default_styler = HeadlineStyler(_get_default_styler().small, word_cache_size=maxsize)
+
+
+def word_cache_info():
+    """Return the `CacheInfo` of the `headLineStyle` word cache, or None if it is disabled"""
+    return _get_default_styler().cache_info()
 
 
 def headLineStyle(text, callback=None, small_first_last=True, preserve_blank_lines=False):
@@ -87,7 +1357,7 @@ def headLineStyle(text, callback=None, small_first_last=True, preserve_blank_lin
     :param text: headLineStyles input text
     :param callback: Callback function that returns the headLineStyle version of a specific word
     :param small_first_last: Capitalize small words (e.g. 'A') at the beginning; disabled when recursing
-    :type text: str
+    :type text: str or bytes
     :type callback: function
     :type small_first_last: bool
     :type preserve_blank_lines: bool
@@ -98,113 +1368,251 @@ def headLineStyle(text, callback=None, small_first_last=True, preserve_blank_lin
     The list of "SMALL words" which are not capped comes from
     the New York Times Manual of Style, plus 'vs' and 'v'.
 
+    UTF-8 encoded bytes are styled as the text they encode, and returned
+    encoded the same way.
     """
-    if preserve_blank_lines:
-        lines = regex.split('[\r\n]', text)
-    else:
-        lines = regex.split('[\r\n]+', text)
-    processed = []
-    for line in lines:
-        all_caps = line.upper() == line
-        words = regex.split('[\t ]', line)
-        tc_line = []
-        for word in words:
-            if callback:
-                new_word = callback(word, all_caps=all_caps)
-                if new_word:
-                    # Address #22: If a callback has done something
-                    # specific, leave this string alone from now on
-                    tc_line.append(_mark_immutable(new_word))
-                    continue
+    return (_default_styler or _get_default_styler())._style(text, callback, small_first_last, preserve_blank_lines)
 
-            if all_caps:
-                if UC_INITIALS.match(word):
-                    tc_line.append(word)
-                    continue
 
-            if APOS_SECOND.match(word):
-                if len(word[0]) == 1 and word[0] not in 'aeiouAEIOU':
-                    word = word[0].lower() + word[1] + word[2].upper() + word[3:]
-                else:
-                    word = word[0].upper() + word[1] + word[2].upper() + word[3:]
-                tc_line.append(word)
-                continue
+def headLineStyle_many(texts, callback=None, small_first_last=True, preserve_blank_lines=False):
+    """
+    :param texts: Iterable of texts to headLineStyle
+    :type texts: iterable
+    :rtype: BatchResult
 
-            match = MAC_MC.match(word)
-            if match:
-                tc_line.append("%s%s" % (match.group(1).capitalize(),
-                                         headLineStyle(match.group(2), callback, True)))
-                continue
+    Batch version of `headLineStyle` taking the same keyword arguments.
+    Identical texts are only styled once, and the results are returned
+    as a list in the order of the input, whose ``unique`` attribute holds
+    the number of distinct texts that were processed. Like `headLineStyle`,
+    it styles bytes texts into bytes.
 
-            match = MR_MRS_MS_DR.match(word)
-            if match:
-                word = word[0].upper() + word[1:]
-                tc_line.append(word)
-                continue
-
-            if INLINE_PERIOD.search(word) or (not all_caps and UC_ELSEWHERE.match(word)):
-                tc_line.append(word)
-                continue
-            if SMALL_WORDS.match(word):
-                tc_line.append(word.lower())
-                continue
-
-            if "/" in word and "//" not in word:
-                slashed = map(
-                    lambda t: headLineStyle(t, callback, False),
-                    word.split('/')
-                )
-                tc_line.append("/".join(slashed))
-                continue
-
-            if '-' in word:
-                hyphenated = map(
-                    lambda t: headLineStyle(t, callback, False),
-                    word.split('-')
-                )
-                tc_line.append("-".join(hyphenated))
-                continue
+    >>> batch = headLineStyle_many(['a thing', 'another thing', 'a thing'])
+    >>> batch, batch.unique
+    (['A Thing', 'Another Thing', 'A Thing'], 2)
+    """
+    return _get_default_styler()._style_many(texts, callback, small_first_last, preserve_blank_lines)
 
-            if all_caps:
-                word = word.lower()
 
-            # A term with all consonants should be considered an acronym.  But if it's
-            # too short (like "St", don't apply this)
-            CONSONANTS = ''.join(set(string.ascii_lowercase)
-                                 - {'a', 'e', 'i', 'o', 'u', 'y'})
-            is_all_consonants = regex.search('\A[' + CONSONANTS + ']+\Z', word,
-                                             flags=regex.IGNORECASE)
-            if is_all_consonants and len(word) > 2:
-                tc_line.append(word.upper())
-                continue
+def headline_style_edits(text, callback=None, small_first_last=True, preserve_blank_lines=False):
+    """
+    :param text: Text to headLineStyle
+    :type text: str or bytes
+    :rtype: list
 
-            # Just a normal word that needs to be capitalized
-            tc_line.append(CAPFIRST.sub(lambda m: m.group(0).upper(), word))
+    Version of `headLineStyle` taking the same keyword arguments, which
+    returns the changes it makes to `text` rather than the styled text:
+    a list of ``(start, end, replacement)`` edits in the order of the
+    text, that replace ``text[start:end]`` with `replacement`. The edits
+    do not overlap, so applying them from the last one to the first one
+    gives the result of `headLineStyle`, and an empty list means that the
+    text is already styled.
 
-        if small_first_last and tc_line:
-            if not isinstance(tc_line[0], Immutable):
-                tc_line[0] = SMALL_FIRST.sub(lambda m: '%s%s' % (
-                    m.group(1),
-                    m.group(2).capitalize()
-                ), tc_line[0])
+    Most edits are case changes of single letters, line breaks other than
+    ``\\n`` are replaced by ``\\n``, and with `preserve_blank_lines` off
+    the blank lines are deleted. The edits of UTF-8 encoded bytes have
+    byte offsets and bytes replacements.
 
-            if not isinstance(tc_line[-1], Immutable):
-                tc_line[-1] = SMALL_LAST.sub(
-                    lambda m: m.group(0).capitalize(), tc_line[-1]
-                )
+    >>> headline_style_edits('a tale of two\\r\\ncities')
+    [(0, 1, 'A'), (2, 3, 'T'), (10, 11, 'T'), (13, 15, '\\n'), (15, 16, 'C')]
+    """
+    return _get_default_styler()._style_edits(text, callback, small_first_last, preserve_blank_lines)
 
-        result = " ".join(tc_line)
 
-        result = SUBPHRASE.sub(lambda m: '%s%s' % (
-            m.group(1),
-            m.group(2).capitalize()
-        ), result)
+def _iter_lines(chunks, preserve_blank_lines):
+    """
+    Split an iterable of text chunks into the lines that `headLineStyle`
+    would process, yielding ``(line, line_break)`` pairs where `line_break`
+    is empty for the last line only.
+    """
+    # Text of the current line seen so far, and whether a complete line
+    # has been emitted yet: like `LINE_BREAKS.split` the first and the
+    # last line are kept even when blank, lines in between are only kept
+    # when they have content.
+    pending = []
+    first = True
+    for chunk in chunks:
+        pieces = LINE_BREAK.split(chunk)
+        if len(pieces) == 1:
+            pending.append(chunk)
+            continue
+        pending.append(pieces[0])
+        pieces[0] = ''.join(pending)
+        pending = [pieces.pop()]
+        for piece in pieces:
+            if piece or first or preserve_blank_lines:
+                yield piece, '\n'
+            first = False
+    last = ''.join(pending)
+    if last:
+        yield last, ''
 
-        processed.append(result)
 
-    result = "\n".join(processed)
-    logger.debug(result)
-    return result
+# Bytes of a mapped input file read before its pages are released
+_RELEASE_SIZE = 1 << 22
+
+
+def _open_mapped(file_path):
+    """
+    Return a read-only mmap of the file at `file_path`, or None when it
+    cannot be mapped, e.g. because it is empty or not a regular file
+    """
+    import mmap
+    with open(file_path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return None
+    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return mapped
+
+
+def _iter_mapped_lines(mapped):
+    """
+    Yield the lines of a UTF-8 encoded buffer, e.g. a mapped file, like
+    iterating over the file opened in text mode: decoded one at a time, and
+    ending in a newline for any of ``\\r\\n``, ``\\r`` and ``\\n``. The pages
+    of an mmap are released once read, so that memory use does not grow
+    with the size of the file.
+    """
+    import mmap
+    import re
+    madvise = None
+    if isinstance(mapped, mmap.mmap) and hasattr(mmap, 'MADV_DONTNEED'):
+        madvise = mapped.madvise
+    released = 0
+    start = 0
+    # UTF-8 sequences of non-ASCII characters never contain \r or \n bytes
+    for match in re.finditer(b'\r\n|\r|\n', mapped):
+        yield mapped[start:match.start()].decode('utf-8') + '\n'
+        start = match.end()
+        if madvise is not None and start - released >= _RELEASE_SIZE:
+            boundary = start - start % mmap.PAGESIZE
+            madvise(mmap.MADV_DONTNEED, released, boundary - released)
+            released = boundary
+    if start < len(mapped):
+        yield mapped[start:].decode('utf-8')
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Styler of a `--jobs` worker process, loaded once by `_init_worker`
+_worker_styler = None
+# `FieldStyler` of a `--jobs` worker process styling records
+_worker_field_styler = None
+
+
+def _init_worker(wordlist_file, field=None, preserve_blank_lines=False):
+    global _worker_styler, _worker_field_styler
+    _worker_styler = HeadlineStyler(overrides=create_wordlist_filter_from_file(wordlist_file),
+                                    preserve_blank_lines=preserve_blank_lines)
+    if field is not None:
+        from .records import field_styler
+        _worker_field_styler = field_styler(field, _worker_styler.style)
+
+
+def _style_pairs(styler, lines):
+    """Style the ``(line, line_break)`` pairs from `_iter_lines` with `styler`"""
+    style_text = styler._style_text
+    return [style_text(line, None, True, False) + line_break for line, line_break in lines]
+
+
+def _style_lines_worker(lines):
+    return _style_pairs(_worker_styler, lines)
+
+
+def _style_records_worker(records):
+    style_record = _worker_field_styler.style_record
+    return [style_record(raw, row) for raw, row in records]
+
+
+def _iter_style_parallel(lines, jobs, wordlist_file, chunk_size=4096, field=None, preserve_blank_lines=False,
+                         cache=None):
+    """
+    Style the ``(line, line_break)`` pairs from `_iter_lines` in a pool of
+    `jobs` worker processes, yielding lists of styled lines in input order.
+    Only a few chunks per worker are in flight at any time, so memory use
+    does not grow with the size of the input.
+
+    With a `field` of `records.field_styler`, the ``(raw, row)`` records
+    of `records.iter_csv_records` or `records.iter_jsonl_records` are styled
+    instead.
+
+    With a `resultcache.ResultCache`, only the lines that are not in the
+    cache are sent to the workers.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    worker = _style_lines_worker if field is None else _style_records_worker
+
+    def result(chunk):
+        if cache is None:
+            return chunk.result()
+        batch, found, future = chunk
+        return cache.fill(batch, found, future.result() if future is not None else ())
+
+    with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                             initargs=(wordlist_file, field, preserve_blank_lines)) as executor:
+        pending = deque()
+        for batch in _batched(lines, chunk_size):
+            if cache is None:
+                pending.append(executor.submit(worker, batch))
+            else:
+                found, misses = cache.lookup(batch)
+                pending.append((batch, found, executor.submit(worker, misses) if misses else None))
+            if len(pending) > 2 * jobs:
+                yield result(pending.popleft())
+        while pending:
+            yield result(pending.popleft())
+
+
+def _iter_style_cached(batches, cache, styler):
+    """
+    Style batches of ``(line, line_break)`` pairs from `_iter_lines` with
+    `styler`, except for the lines in the `resultcache.ResultCache`
+    """
+    for batch in batches:
+        found, misses = cache.lookup(batch)
+        yield cache.fill(batch, found, _style_pairs(styler, misses) if misses else ())
+
+
+def _open_result_cache(path, max_entries, wordlist_file):
+    """
+    Open the `resultcache.ResultCache` at `path` for the lines styled by
+    the command line with the wordlist file `wordlist_file`
+    """
+    from .resultcache import ResultCache, file_fingerprint, fingerprint
+    _load_backend()
+    # Results differ with the regex backend for some non-ASCII text
+    config = fingerprint(__version__, 'regex' if REGEX_AVAILABLE else 're', SMALL, file_fingerprint(wordlist_file))
+    return ResultCache(path, config, max_entries)
+
+
+def iter_headline_style(lines, callback=None, small_first_last=True, preserve_blank_lines=False):
+    """
+    :param lines: Iterable of text chunks to headLineStyle, e.g. an open file
+    :type lines: iterable
+    :rtype: generator
+
+    Streaming version of `headLineStyle` taking the same keyword arguments.
+    The chunks are split into lines on line breaks, and one styled line is
+    yielded at a time, ending in a line break unless it is the last line,
+    so that joining all of them gives the same result as styling the
+    joined input at once. Chunks of UTF-8 encoded bytes, e.g. from a file
+    opened in binary mode, are styled into lines of bytes.
+
+    >>> list(iter_headline_style(['a thing\\n', '\\n', 'another thing\\n']))
+    ['A Thing\\n', 'Another Thing\\n']
+    """
+    return _get_default_styler()._iter_style(lines, callback, small_first_last, preserve_blank_lines)
 
 
 def create_wordlist_filter_from_file(file_path):
@@ -213,26 +1621,45 @@ def create_wordlist_filter_from_file(file_path):
     reading one abbreviation from each line, and return a callback to
     be passed to the `headLineStyle` function for preserving their given
     canonical capitalization during title-casing.
+
+    Lines of several words, like "New York Times", are matched as phrases
+    anywhere in a line of text. The callback is a `Wordlist`.
+
+    Files compiled with `compile_wordlist`, e.g. by the
+    ``headLineStyle-compile-wordlist`` command, are opened with mmap instead
+    of being read and parsed.
     """
+    from .wordlist import Wordlist, is_compiled_wordlist, open_compiled_wordlist
+    debug = _get_logger().debug if _debug_enabled() else None
     if file_path is None:
-        logger.debug('No abbreviations file path given')
-        return lambda word, **kwargs: None
+        if debug:
+            debug('No abbreviations file path given')
+        return Wordlist()
     file_path_str = str(file_path)
     if not os.path.isfile(file_path_str):
-        logger.debug('No abbreviations file found at ' + file_path_str)
-        return lambda word, **kwargs: None
+        if debug:
+            debug('No abbreviations file found at ' + file_path_str)
+        return Wordlist()
+    if is_compiled_wordlist(file_path_str):
+        wordlist = open_compiled_wordlist(file_path_str)
+        if debug:
+            debug('Opened compiled wordlist %s with %d entries', file_path_str, len(wordlist))
+        return wordlist
     with open(file_path_str) as f:
-        logger.debug('Reading abbreviations from file ' + file_path_str)
-        abbrevs_gen = (line.strip() for line in f.read().splitlines() if line)
-        abbrevs = {abbr.upper(): abbr for abbr in abbrevs_gen}
-        if logger.isEnabledFor(logging.DEBUG):
-            for abbr in abbrevs.values():
-                logger.debug('Registered abbreviation: ' + abbr)
-        return lambda word, **kwargs: abbrevs.get(word.upper())
+        if debug:
+            debug('Reading abbreviations from file ' + file_path_str)
+        wordlist = Wordlist(line for line in f.read().splitlines() if line)
+        if debug:
+            for abbr in wordlist.words.values():
+                debug('Registered abbreviation: ' + abbr)
+            for phrase in wordlist.phrases.phrases if wordlist.phrases else ():
+                debug('Registered phrase: ' + phrase)
+        return wordlist
 
 
 def cmd():
     """Handler for command line invocation"""
+    import argparse
 
     # Try to handle any reasonable thing thrown at this.
     # Consume '-f' and '-o' as input/output, allow '-' for stdin/stdout
@@ -250,14 +1677,62 @@ def cmd():
                         help='Wordlist for acronyms')
     parser.add_argument('--preserve-blank-lines', action='store_true',
                         help='Do not skip blank lines in input')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes to headLineStyle with')
+    parser.add_argument('--stats', action='store_true',
+                        help='Report throughput on stderr')
+    field_group = parser.add_mutually_exclusive_group()
+    field_group.add_argument('--csv-column', metavar='NAME',
+                             help='Only headLineStyle the column NAME of CSV input with a header row')
+    field_group.add_argument('--jsonl-field', metavar='PATH',
+                             help='Only headLineStyle the field at the dot separated PATH of JSON lines input')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help='Run a daemon on a Unix socket path or on a HOST:PORT HTTP address')
+    parser.add_argument('--max-batch', type=int, default=256,
+                        help='Largest number of requests the daemon styles in one batch')
+    parser.add_argument('--max-wait', type=float, default=2.0,
+                        help='Milliseconds the daemon waits for a batch to fill up')
+    parser.add_argument('--max-line-length', type=int, default=2 ** 16,
+                        help='Longest line in bytes the daemon reads from a Unix socket')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='Reuse the lines styled by earlier runs from an sqlite cache at PATH')
+    parser.add_argument('--cache-size', type=int, default=1000000,
+                        help='Number of lines kept in the --cache, the least recently used are evicted')
 
     args = parser.parse_args()
 
+    if args.wordlist is not None:
+        wordlist_file = args.wordlist
+    else:
+        wordlist_file = os.path.join(os.path.expanduser('~'), '.headLineStyle.txt')
+
+    if args.serve is not None:
+        from .server import serve
+        styler = HeadlineStyler(overrides=create_wordlist_filter_from_file(wordlist_file),
+                                preserve_blank_lines=args.preserve_blank_lines)
+        try:
+            serve(args.serve, styler, args.max_batch, args.max_wait / 1000.0, args.max_line_length)
+        except FileExistsError as e:
+            parser.error(str(e))
+        return
+
+    if args.csv_column is not None or args.jsonl_field is not None:
+        if args.string:
+            parser.error('--csv-column and --jsonl-field read a file or stdin')
+        if args.cache is not None:
+            parser.error('--cache only applies to lines of text')
+        _cmd_records(parser, args, wordlist_file)
+        return
+
+    # Input files are mapped and their lines decoded one at a time, and
+    # the UTF-8 encoded output is written in large batches
+    mapped = None
     if args.input_file is not None:
         if args.input_file == '-':
             ifile = sys.stdin
         else:
-            ifile = open(args.input_file)
+            mapped = _open_mapped(args.input_file)
+            ifile = open(args.input_file) if mapped is None else None
     else:
         ifile = sys.stdin
 
@@ -265,22 +1740,130 @@ def cmd():
         if args.output_file == '-':
             ofile = sys.stdout
         else:
-            ofile = open(args.output_file, 'w')
+            ofile = open(args.output_file, 'w' if mapped is None else 'wb')
     else:
         ofile = sys.stdout
+    if mapped is not None and ofile is sys.stdout:
+        ofile = sys.stdout.buffer
 
     if len(args.string) > 0:
-        in_string = ' '.join(args.string)
+        lines = [' '.join(args.string)]
+    elif mapped is not None:
+        lines = _iter_mapped_lines(mapped)
     else:
-        with ifile:
-            in_string = ifile.read()
+        lines = ifile
 
-    if args.wordlist is not None:
-        wordlist_file = args.wordlist
+    cache = None
+    if args.cache is not None:
+        cache = _open_result_cache(args.cache, args.cache_size, wordlist_file)
+
+    if args.jobs > 1:
+        batches = _iter_style_parallel(_iter_lines(lines, args.preserve_blank_lines), args.jobs, wordlist_file,
+                                       cache=cache)
     else:
-        wordlist_file = os.path.join(os.path.expanduser('~'), '.headLineStyle.txt')
-    wordlist_filter = create_wordlist_filter_from_file(wordlist_file)
+        styler = HeadlineStyler(overrides=create_wordlist_filter_from_file(wordlist_file),
+                                preserve_blank_lines=args.preserve_blank_lines)
+        if cache is not None:
+            # Lines read from a pipe are written and flushed as soon as
+            # they are styled
+            batches = _iter_style_cached(
+                _batched(_iter_lines(lines, args.preserve_blank_lines), 1 if mapped is None else 4096),
+                cache, styler)
+        elif mapped is None:
+            batches = ([line] for line in styler.iter_style(lines))
+        else:
+            batches = _batched(styler.iter_style(lines), 4096)
 
+    start = time.time()
+    count = 0
     with ofile:
-        ofile.write(headLineStyle(in_string, callback=wordlist_filter,
-                                  preserve_blank_lines=args.preserve_blank_lines))
+        for styled in batches:
+            if mapped is None:
+                # Streamed input, e.g. from a pipe, comes out as it is styled
+                ofile.writelines(styled)
+                ofile.flush()
+            else:
+                text = ''.join(styled)
+                if os.linesep != '\n':
+                    text = text.replace('\n', os.linesep)
+                ofile.write(text.encode('utf-8'))
+            count += len(styled)
+    if lines is ifile:
+        ifile.close()
+    if mapped is not None:
+        del lines, batches
+        mapped.close()
+    if cache is not None:
+        cache.close()
+
+    if args.stats:
+        elapsed = time.time() - start
+        sys.stderr.write('%d lines in %.2fs (%.0f lines/sec)\n' % (
+            count, elapsed, count / elapsed if elapsed else 0))
+        if cache is not None:
+            sys.stderr.write('%d cache hits, %d misses (%.1f%% hit rate)\n' % (
+                cache.hits, cache.misses, 100 * cache.hit_rate()))
+
+
+def _cmd_records(parser, args, wordlist_file):
+    """Handler for the --csv-column and --jsonl-field modes of `cmd`"""
+    from . import records
+
+    # Line breaks are kept as they are, CSV values may contain them
+    if args.input_file is not None and args.input_file != '-':
+        ifile = open(args.input_file, newline='')
+    else:
+        ifile = sys.stdin
+    if args.output_file is not None and args.output_file != '-':
+        ofile = open(args.output_file, 'w', newline='')
+    else:
+        ofile = sys.stdout
+
+    start = time.time()
+    count = 0
+    with ofile:
+        if args.csv_column is not None:
+            record_iter = records.iter_csv_records(ifile)
+            header, row = next(record_iter, ('', None))
+            if row is not None and args.csv_column not in row:
+                parser.error('No column %r in the CSV header' % args.csv_column)
+            ofile.write(header)
+            field = ('csv', row.index(args.csv_column) if row is not None else 0)
+        else:
+            record_iter = records.iter_jsonl_records(ifile)
+            field = ('jsonl', args.jsonl_field)
+
+        if args.jobs > 1:
+            batches = _iter_style_parallel(record_iter, args.jobs, wordlist_file, field=field,
+                                           preserve_blank_lines=args.preserve_blank_lines)
+        else:
+            styler = HeadlineStyler(overrides=create_wordlist_filter_from_file(wordlist_file),
+                                    preserve_blank_lines=args.preserve_blank_lines)
+            field_styler = records.field_styler(field, styler.style)
+            batches = _batched((field_styler.style_record(raw, row) for raw, row in record_iter), 4096)
+        for styled in batches:
+            ofile.writelines(styled)
+            ofile.flush()
+            count += len(styled)
+    if ifile is not sys.stdin:
+        ifile.close()
+
+    if args.stats:
+        elapsed = time.time() - start
+        sys.stderr.write('%d records in %.2fs (%.0f records/sec)\n' % (
+            count, elapsed, count / elapsed if elapsed else 0))
+
+
+def compile_wordlist_cmd():
+    """Handler for the command line compilation of wordlists"""
+    import argparse
+    from .wordlist import compile_wordlist
+    parser = argparse.ArgumentParser(
+        description='Compile a wordlist for headLineStyle into a file that is opened with mmap')
+    parser.add_argument('wordlist', help='Wordlist text file, with one acronym or phrase per line')
+    parser.add_argument('output', help='File to write the compiled wordlist to')
+    args = parser.parse_args()
+
+    with open(args.wordlist) as f:
+        wordlist = compile_wordlist((line for line in f.read().splitlines() if line), args.output)
+    sys.stderr.write('Compiled %d entries into %s\n' % (len(wordlist), args.output))
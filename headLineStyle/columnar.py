@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Title-casing of whole pandas and pyarrow columns.
+
+Columns of headlines tend to repeat the same values many times, so rather
+than styling every row, the column is factorized into its distinct values
+and the codes of every row, only the distinct values are styled, and the
+styled values are taken back into place. Null values are passed through,
+and the column returned has the type of the column given.
+
+Neither pandas nor pyarrow is a dependency of headLineStyle, they are
+imported by the function that needs them.
+"""
+
+from . import _get_default_styler
+
+
+def _style_values(values, callback, small_first_last, preserve_blank_lines):
+    style = _get_default_styler()._style
+    return [style(value, callback, small_first_last, preserve_blank_lines) for value in values]
+
+
+def headline_style_series(series, callback=None, small_first_last=True, preserve_blank_lines=False):
+    """
+    Return a copy of the pandas Series `series` of strings, with every value
+    styled as by `headLineStyle` with the given options. Every distinct value
+    is styled once, and null values are kept as they are.
+
+    >>> import pandas as pd
+    >>> headline_style_series(pd.Series(['a thing', None, 'a thing'], dtype=object)).tolist()
+    ['A Thing', None, 'A Thing']
+    """
+    import numpy
+    import pandas
+
+    dtype = series.dtype
+    if isinstance(dtype, pandas.CategoricalDtype):
+        # The categories are styled in their order, so that ordered
+        # categoricals keep it
+        codes, uniques = series.cat.codes.to_numpy(), dtype.categories
+    else:
+        codes, uniques = pandas.factorize(series)
+    styled_uniques = _style_values(uniques, callback, small_first_last, preserve_blank_lines)
+    # The extra last value is taken for the code -1 of null values
+    styled = numpy.array(styled_uniques + [None], dtype=object)
+    values = styled.take(codes)
+    nulls = codes == -1
+    if nulls.any():
+        # Null values come back as they are, e.g. None, nan or pandas.NA
+        values[nulls] = series.to_numpy(dtype=object)[nulls]
+    if isinstance(dtype, pandas.CategoricalDtype):
+        # Distinct categories may be styled alike
+        categories = pandas.Index(list(dict.fromkeys(styled_uniques)), dtype=dtype.categories.dtype)
+        dtype = pandas.CategoricalDtype(categories, ordered=dtype.ordered)
+    return pandas.Series(values, index=series.index, name=series.name, dtype=dtype)
+
+
+def headline_style_arrow(array, callback=None, small_first_last=True, preserve_blank_lines=False):
+    """
+    Return the pyarrow Array or ChunkedArray `array` of strings with every
+    value styled as by `headLineStyle` with the given options. Every
+    distinct value is styled once, and null values stay null. Only the
+    dictionary of a dictionary encoded array is styled.
+
+    >>> import pyarrow as pa
+    >>> headline_style_arrow(pa.array(['a thing', None, 'a thing'])).to_pylist()
+    ['A Thing', None, 'A Thing']
+    """
+    import pyarrow
+    import pyarrow.compute
+
+    if pyarrow.types.is_dictionary(array.type):
+        if isinstance(array, pyarrow.ChunkedArray):
+            return pyarrow.chunked_array(
+                [headline_style_arrow(chunk, callback, small_first_last, preserve_blank_lines)
+                 for chunk in array.chunks], type=array.type)
+        dictionary = array.dictionary
+        styled = pyarrow.array(
+            _style_values(dictionary.to_pylist(), callback, small_first_last, preserve_blank_lines),
+            type=dictionary.type)
+        return pyarrow.DictionaryArray.from_arrays(array.indices, styled, ordered=array.type.ordered)
+
+    uniques = pyarrow.compute.unique(array).drop_null()
+    # Null values are not in the uniques, and get a null index
+    indices = pyarrow.compute.index_in(array, value_set=uniques)
+    styled = pyarrow.array(
+        _style_values(uniques.to_pylist(), callback, small_first_last, preserve_blank_lines), type=array.type)
+    if isinstance(indices, pyarrow.ChunkedArray):
+        return pyarrow.chunked_array([styled.take(chunk) for chunk in indices.chunks], type=array.type)
+    return styled.take(indices)
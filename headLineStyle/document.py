@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental headLineStyle of a multi-line text that is edited over time.
+"""
+
+import re
+
+from . import _get_default_styler
+
+_LINE_END = re.compile('(\r\n|\r|\n)')
+
+
+def _split_lines(text):
+    """
+    Split `text` into its lines and the line break ending each of them,
+    which is empty for the last line
+    """
+    parts = _LINE_END.split(text)
+    breaks = parts[1::2]
+    breaks.append('')
+    return parts[0::2], breaks
+
+
+class HeadlineDocument(object):
+    """
+    A multi-line text and its lines styled by `headLineStyle`.
+
+    `headLineStyle` styles every line on its own, so after an edit of the
+    text only the lines that changed are styled again. `result` is always
+    the same as ``headLineStyle(text, ...)`` with the options given. A
+    `HeadlineStyler` can be given as `styler` to style the lines with its
+    small word list and word cache, by default the one of `headLineStyle`
+    at the time the document is created is used.
+
+    Lines are numbered from 0, and end at a ``\\n``, ``\\r`` or ``\\r\\n``.
+
+    >>> doc = HeadlineDocument('the first line\\nthe second line')
+    >>> doc.result
+    'The First Line\\nThe Second Line'
+    >>> doc.replace_lines(1, 2, 'a new second line\\nand a third')
+    >>> doc.result
+    'The First Line\\nA New Second Line\\nAnd a Third'
+    >>> doc.lines_styled
+    4
+    """
+
+    def __init__(self, text='', callback=None, small_first_last=True, preserve_blank_lines=False, styler=None):
+        self.callback = callback
+        self.small_first_last = small_first_last
+        self.preserve_blank_lines = preserve_blank_lines
+        self._styler = styler if styler is not None else _get_default_styler()
+        # Number of lines styled since the document was created
+        self.lines_styled = 0
+        self._lines, self._breaks = _split_lines(text)
+        self._styled = self._style_lines(self._lines)
+        self._styled_blank = None
+        self._result = None
+
+    def __repr__(self):
+        return '%s(%d lines)' % (self.__class__.__name__, len(self._lines))
+
+    def __len__(self):
+        return len(self._lines)
+
+    def _style_lines(self, lines):
+        style_text = self._styler._style_text
+        callback, small_first_last = self.callback, self.small_first_last
+        self.lines_styled += len(lines)
+        return [style_text(line, callback, small_first_last, False) for line in lines]
+
+    @property
+    def text(self):
+        """The current text of the document"""
+        return ''.join([line + line_break for line, line_break in zip(self._lines, self._breaks)])
+
+    @property
+    def result(self):
+        """The styled text of the document"""
+        if self._result is None:
+            if self.preserve_blank_lines:
+                pieces = []
+                for styled, line_break in zip(self._styled, self._breaks):
+                    pieces.append(styled)
+                    if len(line_break) == 2:
+                        # headLineStyle sees a blank line within a \r\n
+                        if self._styled_blank is None:
+                            self._styled_blank = self._style_lines([''])[0]
+                        pieces.append(self._styled_blank)
+            else:
+                # Blank lines are dropped, except for the first and last line
+                last = len(self._lines) - 1
+                pieces = [styled for i, (line, styled) in enumerate(zip(self._lines, self._styled))
+                          if line or i == 0 or i == last]
+            self._result = '\n'.join(pieces)
+        return self._result
+
+    def replace_lines(self, start, end, text):
+        """
+        Replace the lines from `start` up to, but not including, `end` with
+        the lines of `text`. An empty range inserts the lines before line
+        `start`, or after the last line when `start` is the number of lines.
+        A `text` of None deletes the lines. Only the new lines are styled.
+        """
+        count = len(self._lines)
+        if not 0 <= start <= end <= count:
+            raise IndexError('Line range %d:%d out of range for %d lines' % (start, end, count))
+        if text is None:
+            lines, breaks = [], []
+            if start == 0 and end == count:
+                # A document always has a line, if only an empty one
+                lines, breaks = [''], ['']
+            elif end == count:
+                self._breaks[start - 1] = ''
+        else:
+            lines, breaks = _split_lines(text)
+            if end > start:
+                breaks[-1] = self._breaks[end - 1]
+            elif start < count:
+                breaks[-1] = '\n'
+            else:
+                self._breaks[-1] = '\n'
+        self._lines[start:end] = lines
+        self._breaks[start:end] = breaks
+        self._styled[start:end] = self._style_lines(lines)
+        self._result = None
+
+    def apply_diff(self, changes):
+        """
+        Apply ``(start, end, text)`` changes as by `replace_lines`, where
+        every line range refers to the lines before any of the changes.
+        The ranges may not overlap.
+        """
+        changes = sorted(changes, key=lambda change: change[:2])
+        for previous, change in zip(changes, changes[1:]):
+            if change[0] < previous[1]:
+                raise ValueError('Overlapping changes %d:%d and %d:%d' % (previous[:2] + change[:2]))
+        for start, end, text in reversed(changes):
+            self.replace_lines(start, end, text)
+
+    def set_text(self, text):
+        """
+        Replace the text of the document, only styling the lines that are
+        not in the current text
+        """
+        lines, breaks = _split_lines(text)
+        old = self._lines
+        limit = min(len(old), len(lines))
+        prefix = 0
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        old_middle = old[prefix:len(old) - suffix]
+        new_middle = lines[prefix:len(lines) - suffix]
+        styled = self._styled[prefix:len(old) - suffix]
+        if old_middle and new_middle:
+            from difflib import SequenceMatcher
+            matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+            middle = []
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == 'equal':
+                    middle.extend(styled[i1:i2])
+                else:
+                    middle.extend(self._style_lines(new_middle[j1:j2]))
+        else:
+            middle = self._style_lines(new_middle)
+        self._styled[prefix:len(old) - suffix] = middle
+        self._lines = lines
+        self._breaks = breaks
+        self._result = None
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+Styling of a single field of CSV or JSON lines records, used by the
+``--csv-column`` and ``--jsonl-field`` options of the command line.
+
+Records are read one at a time, and every record whose field is missing
+or not changed by styling is written exactly as it was read. In the other
+records, only the text of the field is replaced by the styled value, so
+that the rest of the record keeps its quoting, escapes and spacing.
+"""
+
+import csv
+import json
+import re
+from json.decoder import scanstring
+
+from . import _LRUCache
+
+# A CSV field as read by `csv.reader`: an optionally quoted part, whose
+# closing quote may be missing at the end of the data, and the characters
+# after it up to the next delimiter or line break
+_CSV_FIELD = re.compile(r'(?:"(?:[^"]|"")*"?)?[^,\r\n]*')
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def iter_csv_records(lines):
+    """
+    Yield the raw text and the row of every CSV record of `lines`, e.g. a
+    file opened with ``newline=''``. A record spans several lines when a
+    quoted value has line breaks.
+    """
+    pending = []
+
+    def read():
+        for line in lines:
+            pending.append(line)
+            yield line
+
+    for row in csv.reader(read()):
+        raw = ''.join(pending)
+        del pending[:]
+        yield raw, row
+
+
+def iter_jsonl_records(lines):
+    """Yield the raw text of every JSON lines record of `lines`, and None"""
+    for line in lines:
+        yield line, None
+
+
+class FieldStyler(object):
+    """
+    Styles one field of records with the `style` function, remembering the
+    styled version of up to `cache_size` distinct values of the field.
+    """
+
+    def __init__(self, style, cache_size=65536):
+        self._style = style
+        self._cache = _LRUCache(cache_size)
+
+    def style_value(self, value):
+        styled = self._cache.get(value)
+        if styled is None:
+            styled = self._style(value)
+            self._cache.put(value, styled)
+        return styled
+
+
+def _csv_field_span(raw, index):
+    """Return the start and end of the field number `index` of the CSV record `raw`"""
+    start = 0
+    for _ in range(index):
+        start = _CSV_FIELD.match(raw, start).end() + 1
+    return start, _CSV_FIELD.match(raw, start).end()
+
+
+def _json_skip(raw, pos):
+    """Return the position of the first character after the whitespace at `pos`"""
+    return _JSON_WHITESPACE.match(raw, pos).end()
+
+
+def _json_value_span(raw, keys):
+    """
+    Return the start and end of the value at `keys`, object keys and list
+    indices, in the JSON text `raw`, which has a value there
+    """
+    start = _json_skip(raw, 0)
+    for key in keys:
+        pos = _json_skip(raw, start + 1)
+        if raw[start] == '{':
+            while raw[pos] == '"':
+                name, pos = scanstring(raw, pos + 1)
+                pos = _json_skip(raw, _json_skip(raw, pos) + 1)
+                # Of duplicate keys, the last one is loaded
+                if name == key:
+                    start = pos
+                pos = _json_skip(raw, _JSON_DECODER.raw_decode(raw, pos)[1])
+                if raw[pos] == ',':
+                    pos = _json_skip(raw, pos + 1)
+        else:
+            for _ in range(key):
+                pos = _json_skip(raw, _json_skip(raw, _JSON_DECODER.raw_decode(raw, pos)[1]) + 1)
+            start = pos
+    return start, _JSON_DECODER.raw_decode(raw, start)[1]
+
+
+class CsvColumnStyler(FieldStyler):
+    """Styles the column number `index` of CSV records"""
+
+    def __init__(self, index, style, cache_size=65536):
+        super(CsvColumnStyler, self).__init__(style, cache_size)
+        self.index = index
+
+    def style_record(self, raw, row):
+        """Return the text of a record from `iter_csv_records`"""
+        if self.index >= len(row):
+            return raw
+        value = row[self.index]
+        styled = self.style_value(value)
+        if styled == value:
+            return raw
+        start, end = _csv_field_span(raw, self.index)
+        # Quotes are only special at the start of a field
+        if raw.startswith('"', start) or styled.startswith('"') or any(c in styled for c in ',\r\n'):
+            styled = '"%s"' % styled.replace('"', '""')
+        return raw[:start] + styled + raw[end:]
+
+
+class JsonlFieldStyler(FieldStyler):
+    """
+    Styles the string at `path` of JSON lines records, a dot separated path
+    of object keys and list indices such as ``article.titles.0``. Lines that
+    are not JSON, or have no string at the path, are left as they are.
+    """
+
+    def __init__(self, path, style, cache_size=65536):
+        super(JsonlFieldStyler, self).__init__(style, cache_size)
+        self.path = path.split('.')
+
+    @staticmethod
+    def _key(container, key):
+        """Return the key of `container` for a path component, or None"""
+        if isinstance(container, dict):
+            return key if key in container else None
+        if isinstance(container, list) and key.isdigit() and int(key) < len(container):
+            return int(key)
+        return None
+
+    def style_record(self, raw, row):
+        """Return the text of a record from `iter_jsonl_records`"""
+        try:
+            container = json.loads(raw)
+        except ValueError:
+            return raw
+        keys = []
+        for component in self.path:
+            if keys:
+                container = container[keys[-1]]
+            key = self._key(container, component)
+            if key is None:
+                return raw
+            keys.append(key)
+        value = container[keys[-1]]
+        if not isinstance(value, str):
+            return raw
+        styled = self.style_value(value)
+        if styled == value:
+            return raw
+        start, end = _json_value_span(raw, keys)
+        return raw[:start] + json.dumps(styled, ensure_ascii=False) + raw[end:]
+
+
+def field_styler(field, style):
+    """
+    Return the `FieldStyler` of a ``('csv', column index)`` or
+    ``('jsonl', path)`` field
+    """
+    kind, key = field
+    if kind == 'csv':
+        return CsvColumnStyler(key, style)
+    return JsonlFieldStyler(key, style)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent cache of styled lines, used by the ``--cache`` option of the
+command line.
+
+The cache is an sqlite database of the styled version of every line seen,
+keyed by a hash of the line and of a fingerprint of the configuration it
+was styled with, so that results of another configuration are never used.
+Several processes can share a cache: the database is in WAL mode, lookups
+do not block writers, and the results of a run are written in short
+transactions that wait for each other. Once the cache holds more than its
+maximum number of entries, the least recently used ones are evicted.
+"""
+
+import hashlib
+import sqlite3
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    styled TEXT NOT NULL,
+    used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+# Keys looked up by one query, below the smallest limit of sqlite builds
+_LOOKUP_SIZE = 500
+# Entries are stamped with the hour they were last used, so that the hits
+# of runs less than an hour apart are not written again and again
+_STAMP_SECONDS = 3600
+
+
+def fingerprint(*parts):
+    """Return a fingerprint of the configuration described by `parts`"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8', 'surrogatepass')
+        digest.update(b'%d:%s' % (len(part), part))
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """Return a fingerprint of the contents of the file at `path`, or '' if there is none"""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except OSError:
+        return ''
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """
+    Cache of styled lines in the sqlite database at `path`, for the
+    configuration of `fingerprint`, holding at most `max_entries` entries.
+
+    Lines are looked up and styled a batch of ``(line, line_break)`` pairs
+    at a time, as by `_iter_lines`: `lookup` returns the styled lines in
+    the cache and the pairs to style, and `fill` merges in their styled
+    versions, which are stored by `flush`.
+
+    `timeout` is the number of seconds to wait for another process writing
+    to the cache.
+    """
+
+    def __init__(self, path, fingerprint, max_entries=1000000, timeout=30.0, flush_size=4096):
+        self.max_entries = max_entries
+        self.flush_size = flush_size
+        self.hits = 0
+        self.misses = 0
+        self._hash = hashlib.blake2b(fingerprint.encode('ascii'), digest_size=16)
+        self._now = int(time.time()) // _STAMP_SECONDS
+        self._new = {}
+        self._used = set()
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _key(self, line):
+        key = self._hash.copy()
+        key.update(line.encode('utf-8', 'surrogatepass'))
+        return key.digest()
+
+    def _write(self, changes):
+        """Make the `changes` of a function in a transaction of its own"""
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            changes()
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def lookup(self, pairs):
+        """
+        Return the styled lines of the ``(line, line_break)`` `pairs`, with
+        None for those not in the cache, and the list of pairs not in it
+        """
+        keys = [self._key(line) for line, _ in pairs]
+        rows = {}
+        for i in range(0, len(keys), _LOOKUP_SIZE):
+            chunk = keys[i:i + _LOOKUP_SIZE]
+            rows.update((key, (styled, used)) for key, styled, used in self._db.execute(
+                'SELECT key, styled, used FROM results WHERE key IN (%s)' % ','.join('?' * len(chunk)), chunk))
+        found = []
+        misses = []
+        for pair, key in zip(pairs, keys):
+            styled = self._new.get(key)
+            if styled is None:
+                row = rows.get(key)
+                if row is not None:
+                    styled = row[0]
+                    if row[1] != self._now:
+                        self._used.add(key)
+            if styled is None:
+                misses.append(pair)
+            else:
+                styled += pair[1]
+            found.append(styled)
+        self.hits += len(found) - len(misses)
+        self.misses += len(misses)
+        return found, misses
+
+    def fill(self, pairs, found, styled_misses):
+        """
+        Return the styled `pairs`, taken from the `found` lines returned by
+        `lookup` and, for those not found, the `styled_misses` of the pairs
+        not in the cache, which end in their line break. The latter are
+        added to the cache.
+        """
+        styled_misses = iter(styled_misses)
+        result = []
+        for (line, line_break), styled in zip(pairs, found):
+            if styled is None:
+                styled = next(styled_misses)
+                self._new[self._key(line)] = styled[:len(styled) - len(line_break)]
+            result.append(styled)
+        if len(self._new) + len(self._used) >= self.flush_size:
+            self.flush()
+        return result
+
+    def flush(self):
+        """Write the lines styled and the hits since the last flush to the database"""
+        if not self._new and not self._used:
+            return
+        now = self._now
+        new = [(key, styled, now) for key, styled in self._new.items()]
+        used = [(now, key) for key in self._used]
+
+        def changes():
+            self._db.executemany('INSERT OR REPLACE INTO results (key, styled, used) VALUES (?, ?, ?)', new)
+            self._db.executemany('UPDATE results SET used = ? WHERE key = ?', used)
+
+        self._write(changes)
+        self._new.clear()
+        self._used.clear()
+
+    def evict(self):
+        """Delete the least recently used entries beyond `max_entries`"""
+        count_entries = 'SELECT count(*) FROM results'
+        if self._db.execute(count_entries).fetchone()[0] <= self.max_entries:
+            return
+
+        def changes():
+            # Counted again, as another process may have evicted them already
+            excess = self._db.execute(count_entries).fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._db.execute('DELETE FROM results WHERE key IN '
+                                 '(SELECT key FROM results ORDER BY used LIMIT ?)', (excess,))
+
+        self._write(changes)
+
+    def close(self):
+        """Flush, evict and close the database"""
+        try:
+            self.flush()
+            self.evict()
+        finally:
+            self._db.close()
+
+    def hit_rate(self):
+        """Return the fraction of lines looked up that were in the cache"""
+        total = self.hits + self.misses
+        return self.hits / float(total) if total else 0.0
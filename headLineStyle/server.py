@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local headLineStyle daemon, started by ``headLineStyle --serve ADDRESS``.
+
+The daemon keeps a `HeadlineStyler` with its wordlist loaded, and gathers
+concurrent requests into micro-batches that are styled together with
+`HeadlineStyler.style_many`. It listens either on a Unix socket, when the
+address is a path, or over HTTP on a ``HOST:PORT`` address:
+
+- On a Unix socket every line sent is one text to style, and the styled
+  texts are sent back one per line, in order. Requests may be pipelined.
+  A line longer than the maximum line length, or that fails to be styled,
+  is answered with a line starting with ``ERROR:``.
+- Over HTTP, the body of a ``POST`` request is the text to style, and the
+  body of the response is the styled text. Connections are kept alive.
+"""
+
+import asyncio
+import os
+import stat
+
+# Longest line in bytes read from a Unix socket, as for `asyncio.StreamReader`
+MAX_LINE_LENGTH = 2 ** 16
+
+
+class MicroBatcher(object):
+    """
+    Collects texts submitted from the event loop, and styles them in one
+    batch once `max_batch` texts are waiting or the first of them has waited
+    for `max_wait` seconds.
+    """
+
+    def __init__(self, styler, max_batch=256, max_wait=0.002):
+        self.styler = styler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.texts = 0
+        self._pending = []
+        self._timer = None
+
+    def submit(self, text):
+        """Queue `text` for styling and return a future of the styled text"""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        """Style every pending text now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.texts += len(batch)
+        try:
+            results = self.styler.style_many([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+async def _write_results(writer, futures):
+    while True:
+        future = await futures.get()
+        if future is None:
+            break
+        try:
+            result = await future
+        except Exception as e:
+            result = 'ERROR: %s' % e
+        writer.write(result.replace('\n', ' ').encode('utf-8', 'surrogateescape') + b'\n')
+        await writer.drain()
+
+
+async def _read_line(reader):
+    """
+    Return the next line of `reader`, b'' at the end, or None for a line
+    longer than the limit of `reader`, which is skipped
+    """
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError:
+        pass
+    while True:
+        try:
+            await reader.readuntil(b'\n')
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+
+
+async def _handle_lines(batcher, reader, writer, max_line_length):
+    futures = asyncio.Queue()
+    results = asyncio.ensure_future(_write_results(writer, futures))
+    try:
+        while True:
+            line = await _read_line(reader)
+            if line is None:
+                # Answered in turn, after the lines before it
+                future = asyncio.get_event_loop().create_future()
+                future.set_exception(ValueError('line longer than %d bytes' % max_line_length))
+                futures.put_nowait(future)
+                continue
+            if not line:
+                break
+            # Undecodable bytes are kept as they are through surrogates
+            futures.put_nowait(batcher.submit(line.decode('utf-8', 'surrogateescape').rstrip('\r\n')))
+        futures.put_nowait(None)
+        await results
+    finally:
+        results.cancel()
+        writer.close()
+
+
+async def _read_http_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method = request_line.split(b' ', 1)[0].upper()
+    headers = {}
+    while True:
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = header.partition(b':')
+        headers[name.strip().lower()] = value.strip()
+    body = b''
+    length = int(headers.get(b'content-length', b'0'))
+    if length:
+        body = await reader.readexactly(length)
+    keep_alive = headers.get(b'connection', b'').lower() != b'close'
+    return method, body, keep_alive
+
+
+def _http_response(status, body, keep_alive):
+    return b''.join([
+        b'HTTP/1.1 ', status, b'\r\n',
+        b'Content-Type: text/plain; charset=utf-8\r\n',
+        b'Content-Length: ', str(len(body)).encode('ascii'), b'\r\n',
+        b'Connection: ', b'keep-alive' if keep_alive else b'close', b'\r\n',
+        b'\r\n', body,
+    ])
+
+
+async def _handle_http(batcher, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_http_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(_http_response(b'400 Bad Request', b'', False))
+                break
+            if request is None:
+                break
+            method, body, keep_alive = request
+            if method != b'POST':
+                writer.write(_http_response(b'405 Method Not Allowed', b'', keep_alive))
+            else:
+                result = await batcher.submit(body.decode('utf-8', 'surrogateescape'))
+                writer.write(_http_response(b'200 OK', result.encode('utf-8', 'surrogateescape'), keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+def parse_address(address):
+    """
+    Return ``('http', (host, port))`` for a ``HOST:PORT`` address, or
+    ``('unix', path)`` for any other address
+    """
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and os.sep not in address:
+        return 'http', (host or '127.0.0.1', int(port))
+    return 'unix', address
+
+
+async def start_server(address, styler, max_batch=256, max_wait=0.002, max_line_length=MAX_LINE_LENGTH):
+    """
+    Start serving `styler` on `address` from the running event loop, and
+    return the `asyncio.AbstractServer` and the `MicroBatcher`. Lines sent
+    to a Unix socket are at most `max_line_length` bytes long.
+
+    A Unix socket left at the path of `address` by a previous daemon is
+    replaced, but any other file there raises `FileExistsError`.
+    """
+    batcher = MicroBatcher(styler, max_batch, max_wait)
+    kind, where = parse_address(address)
+    if kind == 'http':
+        server = await asyncio.start_server(
+            lambda reader, writer: _handle_http(batcher, reader, writer), *where)
+    else:
+        try:
+            mode = os.lstat(where).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError('%s exists and is not a socket' % where)
+            os.unlink(where)
+        server = await asyncio.start_unix_server(
+            lambda reader, writer: _handle_lines(batcher, reader, writer, max_line_length), where,
+            limit=max_line_length)
+    return server, batcher
+
+
+def serve(address, styler, max_batch=256, max_wait=0.002, max_line_length=MAX_LINE_LENGTH):
+    """Serve `styler` on `address` until interrupted"""
+
+    async def run():
+        server, _ = await start_server(address, styler, max_batch, max_wait, max_line_length)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -3,12 +3,34 @@
 
 """Tests for headLineStyle"""
 
+import asyncio
 import os
+import random
+import shutil
+import socket
+import subprocess
 import sys
 import tempfile
+import threading
+import time
 import unittest
 
-from headLineStyle import headLineStyle, create_wordlist_filter_from_file, set_small_word_list
+from headLineStyle import (headLineStyle, headLineStyle_many, iter_headline_style, headline_style_edits,
+                           HeadlineStyler, create_wordlist_filter_from_file, set_small_word_list,
+                           set_word_cache_size, word_cache_info, ENGINES, Wordlist, HeadlineDocument)
+from headLineStyle import records
+from headLineStyle.resultcache import ResultCache, fingerprint
+from headLineStyle.server import start_server
+from headLineStyle.wordlist import PhraseMatcher, compile_wordlist
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
@@ -347,6 +369,19 @@ class TestSymbols(unittest.TestCase):
         self.assertEqual(headLineStyle("at&t", callback=TestSymbols.at_n_t), "AT&T")
 
 
+class TestBytes(unittest.TestCase):
+    def test_specific_string(self):
+        for data in TEST_DATA:
+            with self.subTest():
+                result = headLineStyle(data[0].encode('utf-8'))
+                self.assertIsInstance(result, bytes)
+                self.assertEqual(result.decode('utf-8'), data[1])
+
+    def test_undecodable(self):
+        self.assertEqual(headLineStyle(b'caf\xe9 au lait'), b'Caf\xe9 Au Lait')
+        self.assertEqual(HeadlineStyler(callback=TestCallback.abbreviation).style(b'over tcp'), b'Over TCP')
+
+
 class TestCallback(unittest.TestCase):
     @staticmethod
     def abbreviation(word, **kwargs):
@@ -367,16 +402,87 @@ class TestCallback(unittest.TestCase):
                          u'CRÈME BRÛLÉE')
 
 
-# It looks like set_small_word_list uses different regexs that the original
-# setup code path :/. It really should be the case that one could call
-# headLineStyle.set_small_word_list() and reset to the original behavior (it
-# _really_ should be the case that there aren't all these ugly globals around).
-#
-# It seems that `nose` ran every test in isolation, or just in a different
-# order, so the global state bug wasn't caught before. This should be fixed,
-# but one thingg at a time.
-@unittest.skip("FIXME: Converting to unittest exposed a bug")
+class TestOverrides(unittest.TestCase):
+    def test_overrides(self):
+        s = 'a simple tcp and udp wrapper'
+        for overrides in (['UDP'], {'udp': 'UDP'}, Wordlist(['UDP'])):
+            styler = HeadlineStyler(overrides=overrides)
+            self.assertEqual(styler.style(s), 'A Simple TCP and UDP Wrapper')
+            self.assertEqual(styler.style(s.upper()), 'A Simple TCP and UDP Wrapper')
+            self.assertEqual(styler.style('udp-over-tcp\tudp/ip'), 'UDP-Over-TCP UDP/Ip')
+
+    def test_same_as_callback(self):
+        wordlist = Wordlist(['UDP', 'iOS', 'The', 'Dónde', 'New York Times', 'McDonald'])
+        for engine in ENGINES:
+            callback = HeadlineStyler(callback=wordlist, engine=engine)
+            overrides = HeadlineStyler(overrides=wordlist, engine=engine, word_cache_size=100)
+            for text in ('ios and udp: state-of-the-art', 'THE NEW YORK TIMES ON IOS', '¿dónde está udp?',
+                         'mcdonald and mcios', 'the\tnew york times'):
+                self.assertEqual(overrides.style(text), callback.style(text))
+
+    def test_before_callback(self):
+        styler = HeadlineStyler(callback=lambda word, **kwargs: word.upper(), overrides={'ios': 'iOS'})
+        self.assertEqual(styler.style('ios app'), 'iOS APP')
+
+    def test_dict_phrases(self):
+        styler = HeadlineStyler(overrides={'new  york times': 'New York TIMES', ' ios ': 'iOS'})
+        self.assertEqual(styler.style('the new york times on ios'), 'The New York TIMES on iOS')
+        self.assertRaises(ValueError, HeadlineStyler, overrides={'nyt times': 'New York Times'})
+
+    def test_phrases_with_wordlist_callback(self):
+        styler = HeadlineStyler(callback=Wordlist(['TCP']), overrides=['New York Times'])
+        self.assertEqual(styler.style('the new YORK times over tcp'), 'The New York Times Over TCP')
+        # Phrases of the overrides win over overlapping ones of the callback
+        styler = HeadlineStyler(callback=Wordlist(['NEW YORK times', 'times SQUARE', 'big APPLE']),
+                                overrides=['New York Times'])
+        self.assertEqual(styler.style('new york times square in the big apple'),
+                         'New York Times Square in the big APPLE')
+
+
+class TestLimits(unittest.TestCase):
+    def test_chunks_same_as_line(self):
+        text = ' '.join(data[0] for data in TEST_DATA if '\n' not in data[0])
+        wordlist = Wordlist(['UDP', 'New York Times', 'x-ray'])
+        for kwargs in ({}, {'callback': wordlist}, {'overrides': wordlist, 'engine': 'combined'}):
+            expected = HeadlineStyler(**kwargs).style(text)
+            for max_line_length in (1, 7, 100):
+                with self.subTest(max_line_length=max_line_length, **kwargs):
+                    styler = HeadlineStyler(max_line_length=max_line_length, **kwargs)
+                    self.assertEqual(styler.style(text), expected)
+                    self.assertEqual(styler.style(text.upper()), HeadlineStyler(**kwargs).style(text.upper()))
+
+    def test_subphrase_across_chunks(self):
+        for text in ('x: v. a b', 'one: the end', 'so:\tthe end'):
+            styler = HeadlineStyler(max_line_length=3)
+            self.assertEqual(styler.style(text), headLineStyle(text))
+
+    def test_long_words(self):
+        styler = HeadlineStyler(max_word_length=5, callback=lambda word, **kwargs: word.upper())
+        self.assertEqual(styler.style('of tcp/ip-based the'), 'OF tcp/ip-based THE')
+        mcs = 'mc' * 5000
+        self.assertEqual(HeadlineStyler(max_word_length=100).style('the %s of' % mcs), 'The %s Of' % mcs)
+
+    def test_timeout(self):
+        def slow(word, **kwargs):
+            time.sleep(0.001)
+
+        styler = HeadlineStyler(callback=slow, timeout=0.01)
+        self.assertEqual(styler.style('a short title'), 'A Short Title')
+        with self.assertRaises(TimeoutError):
+            styler.style('word ' * 2000)
+        with self.assertRaises(TimeoutError):
+            styler.style('word\n' * 2000)
+
+    def test_invalid_limits(self):
+        for kwargs in ({'max_line_length': 0}, {'max_word_length': -1}, {'timeout': 0}):
+            with self.assertRaises(ValueError):
+                HeadlineStyler(**kwargs)
+
+
 class TestSmallWordList(unittest.TestCase):
+    def tearDown(self):
+        set_small_word_list()
+
     def test_set_small_word_list(self):
         self.assertEqual(headLineStyle('playing the game "words with friends"'),
                          'Playing the Game "Words With Friends"')
@@ -384,6 +490,234 @@ class TestSmallWordList(unittest.TestCase):
         self.assertEqual(headLineStyle('playing the game "words with friends"'),
                          'Playing the Game "Words with Friends"')
 
+    def test_reset_small_word_list(self):
+        set_small_word_list('a|an|the|with')
+        set_small_word_list()
+        for data in TEST_DATA:
+            with self.subTest():
+                self.assertEqual(headLineStyle(data[0]), data[1])
+
+
+class TestThreads(unittest.TestCase):
+    SMALL = 'a|an|the|with|game|words'
+
+    def tearDown(self):
+        set_small_word_list()
+        set_word_cache_size(None)
+
+    def test_reconfigure_under_load(self):
+        texts = [data[0] for data in TEST_DATA] + ['playing the game "words with friends" with a game of words']
+        # Every result has to be the one of either small word list, never a mix of the two
+        expected = [{headLineStyle(text), HeadlineStyler(self.SMALL).style(text)} for text in texts]
+        torn = []
+        stop = threading.Event()
+
+        def style():
+            while not stop.is_set():
+                for text, results in zip(texts, expected):
+                    result = headLineStyle(text)
+                    if result not in results:
+                        torn.append((text, result))
+
+        threads = [threading.Thread(target=style) for _ in range(4)]
+        # Switch between threads as often as possible where there is a GIL
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        for thread in threads:
+            thread.start()
+        try:
+            for i in range(200):
+                if i % 2:
+                    set_small_word_list(self.SMALL)
+                else:
+                    set_small_word_list()
+                if i % 10 == 0:
+                    set_word_cache_size(None if i % 20 else 1000)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(torn, [])
+
+
+class TestAsciiCharacters(unittest.TestCase):
+    def test_same_as_patterns(self):
+        import headLineStyle as module
+        chars = [chr(i) for i in range(128)]
+        self.assertEqual(set(module._ASCII_PUNCT), {c for c in chars if module.regex.match('[%s]' % module.PUNCT, c)})
+        self.assertEqual(module._ASCII_CAPFIRST_CHARS, {c for c in chars if module.CAPFIRST.match(c)})
+        self.assertEqual(module._ASCII_INLINE_CHARS, {c for c in chars if module.INLINE_PERIOD.search(c + '.a')})
+        self.assertEqual(module._ASCII_APOS_CHARS, {c for c in chars if module.APOS_SECOND.match("d'" + c)})
+
+
+class TestHeadlineStyler(unittest.TestCase):
+    def test_default_matches_function(self):
+        styler = HeadlineStyler()
+        for data in TEST_DATA:
+            with self.subTest():
+                self.assertEqual(styler.style(data[0]), data[1])
+
+    def test_independent_small_word_lists(self):
+        s = 'playing the game "words with friends"'
+        with_styler = HeadlineStyler(small='a|an|the|with')
+        default_styler = HeadlineStyler()
+        self.assertEqual(with_styler.style(s), 'Playing the Game "Words with Friends"')
+        self.assertEqual(default_styler.style(s), 'Playing the Game "Words With Friends"')
+        self.assertEqual(headLineStyle(s), 'Playing the Game "Words With Friends"')
+
+    def test_bound_options(self):
+        styler = HeadlineStyler(callback=TestCallback.abbreviation, preserve_blank_lines=True)
+        self.assertEqual(styler.style('a simple tcp and udp wrapper\n\nover udp'),
+                         'A Simple TCP and UDP Wrapper\n\nOver UDP')
+
+
+class TestWordCache(unittest.TestCase):
+    def tearDown(self):
+        set_word_cache_size()
+
+    def test_cached_results(self):
+        styler = HeadlineStyler(word_cache_size=64)
+        for _ in range(2):
+            for data in TEST_DATA:
+                with self.subTest():
+                    self.assertEqual(styler.style(data[0]), data[1])
+        info = styler.cache_info()
+        self.assertGreater(info.hits, 0)
+        self.assertLessEqual(info.currsize, 64)
+
+    def test_positional_fixups(self):
+        styler = HeadlineStyler(word_cache_size=16)
+        self.assertEqual(styler.style('the end of the'), 'The End of The')
+        self.assertEqual(styler.style('of the end'), 'Of the End')
+        self.assertEqual(styler.cache_info().hits, 4)
+
+    def test_keyed_on_callback(self):
+        styler = HeadlineStyler(word_cache_size=16)
+        self.assertEqual(styler._style('udp', None, True, False), 'Udp')
+        self.assertEqual(styler._style('udp', TestCallback.abbreviation, True, False), 'UDP')
+
+    def test_cached_callback(self):
+        calls = []
+
+        def callback(word, **kwargs):
+            calls.append(word)
+            if word == 'of':
+                return 'of'
+            return TestCallback.abbreviation(word, **kwargs)
+
+        styler = HeadlineStyler(callback=callback, word_cache_size=16)
+        for _ in range(2):
+            # The spelling returned for the last word is still final
+            self.assertEqual(styler.style('a wrapper over udp of'), 'A Wrapper Over UDP of')
+        self.assertEqual(calls, ['a', 'wrapper', 'over', 'udp', 'of'])
+
+    def test_deprecated_immutable(self):
+        import headLineStyle as module
+        for name in ('Immutable', 'ImmutableString', 'ImmutableBytes'):
+            with self.subTest(name=name), self.assertWarns(DeprecationWarning):
+                self.assertTrue(issubclass(getattr(module, name), module._Immutable))
+
+    def test_module_cache(self):
+        self.assertIsNone(word_cache_info())
+        set_word_cache_size(8)
+        headLineStyle('a thing')
+        headLineStyle('a thing')
+        self.assertEqual(word_cache_info(), (2, 2, 8, 2))
+        set_word_cache_size()
+        self.assertIsNone(word_cache_info())
+
+
+class TestBatch(unittest.TestCase):
+    def test_many(self):
+        texts = [data[0] for data in TEST_DATA]
+        results = headLineStyle_many(texts + texts)
+        self.assertEqual(results, [data[1] for data in TEST_DATA] * 2)
+        self.assertEqual(results.unique, len(set(texts)))
+
+    def test_many_generator(self):
+        results = headLineStyle_many((s for s in ('at&t', 'a thing', 'at&t')), callback=TestSymbols.at_n_t)
+        self.assertEqual(results, ['AT&T', 'A Thing', 'AT&T'])
+        self.assertEqual(results.unique, 2)
+
+    def test_styler_many(self):
+        styler = HeadlineStyler(preserve_blank_lines=True)
+        self.assertEqual(styler.style_many(['one\n\ntwo', 'one\n\ntwo']), ['One\n\nTwo', 'One\n\nTwo'])
+
+    def test_many_bytes(self):
+        results = headLineStyle_many([b'a thing', 'a thing', b'caf\xc3\xa9 \xff', b'a thing'])
+        self.assertEqual(results, [b'A Thing', 'A Thing', b'Caf\xc3\xa9 \xff', b'A Thing'])
+        self.assertEqual(results.unique, 3)
+
+
+class TestEngines(unittest.TestCase):
+    ATOMS = ('a', 'b', 'x', 'y', 'A', 'X', 'mc', 'Mc', 'MC', 'mr', 'Dr', 'ms', 'o', 'd', 'L', "'", '‘',
+             '.', '/', '//', '-', '—', ':', ' ', '\t', 'the', 'THE', 'of', 'vs', 'v.', 'iTunes', 'ſ',
+             '\u212a', 'İ', 'ß', 'Ñ', 'é', '3', '"', '“', '(', '?', ',', '&')
+
+    def test_specific_string(self):
+        for engine in ENGINES:
+            styler = HeadlineStyler(engine=engine)
+            for data in TEST_DATA:
+                with self.subTest(engine=engine):
+                    self.assertEqual(styler.style(data[0]), data[1])
+
+    def test_same_as_cascade(self):
+        rand = random.Random(0)
+        cascade = HeadlineStyler(engine='cascade')
+        stylers = [HeadlineStyler(engine=engine) for engine in ENGINES]
+        for _ in range(2000):
+            s = ''.join(rand.choice(self.ATOMS) for _ in range(rand.randint(1, 8)))
+            if rand.random() < 0.3:
+                s = s.upper()
+            for styler in stylers:
+                for callback in (None, TestCallback.abbreviation):
+                    self.assertEqual(styler._style(s, callback, True, False),
+                                     cascade._style(s, callback, True, False),
+                                     (styler.engine, s))
+
+    def test_ascii_same_as_unicode(self):
+        # ASCII words are classified without the Unicode property patterns
+        rand = random.Random(0)
+        styler = HeadlineStyler()
+        atoms = [atom for atom in self.ATOMS if atom.isascii() and atom not in ' \t'] + [
+            'A.', 'BC', "'s", 's', '_', '1', '`', '[', '\\', '~', '!']
+        for _ in range(5000):
+            word = ''.join(rand.choice(atoms) for _ in range(rand.randint(1, 6)))
+            for all_caps in (False, True):
+                rule, match = styler._classify_ascii(word, all_caps)
+                expected_rule, expected_match = styler._classify(word, all_caps)
+                self.assertEqual((rule, match and match.group(0)),
+                                 (expected_rule, expected_match and expected_match.group(0)), (word, all_caps))
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, HeadlineStyler, engine='nope')
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_specific_string(self):
+        styler = HeadlineStyler(instrument=True)
+        for data in TEST_DATA:
+            with self.subTest():
+                self.assertEqual(styler.style(data[0]), data[1])
+        self.assertGreater(styler.stats()['plain'].count, 0)
+
+    def test_counts(self):
+        styler = HeadlineStyler(callback=TestCallback.abbreviation, instrument=True)
+        self.assertEqual(styler.style('a simple tcp and udp wrapper'), 'A Simple TCP and UDP Wrapper')
+        stats = styler.stats()
+        self.assertEqual(stats['callback'].count, 6)
+        self.assertEqual(stats['small'].count, 2)
+        self.assertEqual(stats['plain'].count, 2)
+        self.assertEqual(stats['subphrase'].count, 1)
+        self.assertGreaterEqual(stats['callback'].time, 0.0)
+        styler.stats_clear()
+        self.assertEqual(styler.stats(), {})
+
+    def test_disabled(self):
+        self.assertIsNone(HeadlineStyler().stats())
+        self.assertRaises(ValueError, HeadlineStyler, engine='cascade', instrument=True)
+
 
 class TestCustomAbbreviations(unittest.TestCase):
     def setUp(self):
@@ -410,6 +744,85 @@ class TestCustomAbbreviations(unittest.TestCase):
             'Sending UDP Packets Over PPPoE Works Great')
 
 
+class TestPhrases(unittest.TestCase):
+    def setUp(self):
+        self.f = tempfile.NamedTemporaryFile(mode='w', delete=False)
+        self.f.write('UDP\nNew York Times\niPhone 15 Pro\nWi-Fi 6E\nNew   York\n')
+        self.f.flush()
+
+    def tearDown(self):
+        self.f.close()
+        os.unlink(self.f.name)
+
+    def test_phrases(self):
+        wordlist = create_wordlist_filter_from_file(self.f.name)
+        self.assertEqual(headLineStyle('review: the new york times on the iphone 15 pro and wi-fi 6e over udp',
+                                       callback=wordlist),
+                         'Review: The New York Times on the iPhone 15 Pro and Wi-Fi 6E Over UDP')
+        self.assertEqual(headLineStyle('(new york times) said', callback=wordlist), '(New York Times) Said')
+        self.assertEqual(headLineStyle('a new yorker in new york', callback=wordlist), 'A New Yorker in New York')
+        self.assertEqual(headLineStyle('iphone 15 professional', callback=wordlist), 'Iphone 15 Professional')
+
+    def test_phrases_in_compound_words(self):
+        wordlist = Wordlist(['New York'])
+        self.assertEqual(headLineStyle('brand-new york times', callback=wordlist), 'Brand-New York Times')
+        self.assertEqual(headLineStyle('the new york-based firm', callback=wordlist), 'The New York-Based Firm')
+        self.assertEqual(HeadlineStyler(overrides=wordlist).style('the new york-based firm'),
+                         'The New York-Based Firm')
+
+    def test_find_phrases(self):
+        wordlist = Wordlist(['New York', 'York Times Square', 'New York Times'])
+        self.assertEqual(wordlist.find_phrases('new york times square'), [(0, 14, 'New York Times')])
+        self.assertEqual(wordlist.find_phrases('a york times square'), [(2, 19, 'York Times Square')])
+        self.assertEqual(wordlist.find_phrases('brand-new york'), [(6, 14, 'New York')])
+        self.assertEqual(wordlist.find_phrases('renew york'), [])
+
+    def test_phrase_matcher(self):
+        matcher = PhraseMatcher(['he', 'she', 'his', 'hers'])
+        self.assertEqual(sorted(matcher.finditer('ushers')), [(1, 4, 'she'), (2, 4, 'he'), (2, 6, 'hers')])
+
+
+class TestCompiledWordlist(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'wordlist.bin')
+
+    def tearDown(self):
+        os.unlink(self.path)
+        os.rmdir(self.dir)
+
+    def test_compiled(self):
+        compile_wordlist(['UDP', 'PPPoE', 'Über', 'New York Times'], self.path)
+        wordlist = create_wordlist_filter_from_file(self.path)
+        self.assertEqual(len(wordlist), 4)
+        self.assertEqual(wordlist('über'), 'Über')
+        self.assertIsNone(wordlist('tcp'))
+        self.assertEqual(headLineStyle('sending udp packets over pppoe to the new york times',
+                                       callback=wordlist),
+                         'Sending UDP Packets Over PPPoE to the New York Times')
+
+    def test_many_entries(self):
+        entries = ['W%dx' % i for i in range(5000)]
+        compile_wordlist(entries, self.path)
+        wordlist = create_wordlist_filter_from_file(self.path)
+        self.assertEqual(len(wordlist), 5000)
+        for entry in entries:
+            self.assertEqual(wordlist(entry.lower()), entry)
+
+    def test_phrases(self):
+        entries = ['New York', 'New York Times', 'York Times Square', 'Straße Nord', 'ab ab', 'b ab ab']
+        compiled = compile_wordlist(entries, self.path)
+        wordlist = create_wordlist_filter_from_file(self.path)
+        self.assertEqual(len(wordlist), len(entries))
+        for line in ('new york times square', 'brand-new york', 'STRASSE NORD', 'b ab ab ab ab', 'renew york'):
+            with self.subTest(line=line):
+                self.assertEqual(wordlist.find_phrases(line), compiled.find_phrases(line))
+
+    def test_empty(self):
+        compile_wordlist([], self.path)
+        self.assertEqual(len(create_wordlist_filter_from_file(self.path)), 0)
+
+
 class TestBlankLines(unittest.TestCase):
     # Really, it's a bit odd that the default behavior is to delete blank lines,
     # but that's what it was from day one, so we're kind of stuck with that.
@@ -428,5 +841,518 @@ class TestBlankLines(unittest.TestCase):
                          '\n\nLeading Blank\n\n\nMulti-Blank\n\n\n\n\nTrailing Blank\n\n')
 
 
+class TestStreaming(unittest.TestCase):
+    def assertStreams(self, chunks, **kwargs):
+        self.assertEqual(''.join(iter_headline_style(chunks, **kwargs)),
+                         headLineStyle(''.join(chunks), **kwargs))
+
+    def test_lines(self):
+        s = '\n\nLeading blank\n\n\nMulti-blank\n\n\n\n\nTrailing Blank\n\n'
+        for preserve_blank_lines in (False, True):
+            with self.subTest(preserve_blank_lines=preserve_blank_lines):
+                self.assertStreams(s.splitlines(True), preserve_blank_lines=preserve_blank_lines)
+                self.assertStreams(list(s), preserve_blank_lines=preserve_blank_lines)
+
+    def test_split_line_breaks(self):
+        for preserve_blank_lines in (False, True):
+            with self.subTest(preserve_blank_lines=preserve_blank_lines):
+                self.assertStreams(['this is a\r', '\nsplit line', ''], preserve_blank_lines=preserve_blank_lines)
+                self.assertStreams(['no line break'], preserve_blank_lines=preserve_blank_lines)
+                self.assertStreams([], preserve_blank_lines=preserve_blank_lines)
+
+    def test_yields_lines(self):
+        self.assertEqual(list(iter_headline_style(['the first', ' line\nthe second line\n'])),
+                         ['The First Line\n', 'The Second Line\n'])
+
+    def test_bytes(self):
+        data = 'the café\r\nof ümlauts\n\n'.encode('utf-8') + b'and \xff bytes'
+        for preserve_blank_lines in (False, True):
+            with self.subTest(preserve_blank_lines=preserve_blank_lines):
+                expected = headLineStyle(data, preserve_blank_lines=preserve_blank_lines)
+                # Every chunk is a single byte, splitting the characters
+                chunks = [data[i:i + 1] for i in range(len(data))]
+                lines = list(iter_headline_style(chunks, preserve_blank_lines=preserve_blank_lines))
+                self.assertTrue(all(isinstance(line, bytes) for line in lines))
+                self.assertEqual(b''.join(lines), expected)
+
+
+class TestEdits(unittest.TestCase):
+    @staticmethod
+    def apply(text, edits):
+        for start, end, replacement in reversed(edits):
+            text = text[:start] + replacement + text[end:]
+        return text
+
+    def test_edits(self):
+        self.assertEqual(headline_style_edits('The Title'), [])
+        self.assertEqual(headline_style_edits('the title\tof it'),
+                         [(0, 1, 'T'), (4, 5, 'T'), (9, 10, ' '), (13, 14, 'I')])
+        self.assertEqual(headline_style_edits('A\r\n\nB'), [(1, 4, '\n')])
+        self.assertEqual(HeadlineStyler(overrides=['iOS']).style_edits('ios'), [(1, 3, 'OS')])
+
+    def test_same_as_headline_style(self):
+        texts = [input_text for input_text, _ in TEST_DATA]
+        texts += ['straße ßa\r\n\r\nmcßa', 'the ŉ\n\n', '\r\na\n']
+        for text in texts:
+            for preserve_blank_lines in (False, True):
+                edits = headline_style_edits(text, preserve_blank_lines=preserve_blank_lines)
+                self.assertEqual(self.apply(text, edits),
+                                 headLineStyle(text, preserve_blank_lines=preserve_blank_lines))
+                ends = [0] + [end for _, end, _ in edits]
+                self.assertTrue(all(end <= edit[0] for end, edit in zip(ends, edits)))
+
+    def test_bytes(self):
+        self.assertEqual(headline_style_edits(b'a tale'), [(0, 1, b'A'), (2, 3, b'T')])
+        for text in ('straße ßa\r\n\r\nmcßa', 'the ŉ of ümlauts\n\n', 'ios'):
+            data = text.encode('utf-8') + b' \xff end'
+            edits = HeadlineStyler(overrides=['iÖS']).style_edits(data)
+            self.assertEqual(self.apply(data, edits), HeadlineStyler(overrides=['iÖS']).style(data))
+
+
+class TestDocument(unittest.TestCase):
+    LINES = ('the first line', 'THE SECOND LINE', '', 'of mice and men', 'a tcp wrapper', '\t', 'the end')
+    BREAKS = ('\n', '\n', '\r\n', '\r', '\n\n')
+
+    def random_text(self, rand, count):
+        return ''.join(rand.choice(self.LINES) + rand.choice(self.BREAKS) for _ in range(count))
+
+    def test_edits(self):
+        rand = random.Random(0)
+        for preserve in (False, True):
+            doc = HeadlineDocument(self.random_text(rand, 5), callback=TestCallback.abbreviation,
+                                   preserve_blank_lines=preserve)
+            for _ in range(300):
+                start = rand.randint(0, len(doc))
+                end = rand.randint(start, min(len(doc), start + 3))
+                text = None if rand.random() < 0.2 else self.random_text(rand, rand.randint(0, 3))
+                before = doc.lines_styled
+                doc.replace_lines(start, end, text)
+                if text is not None:
+                    self.assertLessEqual(doc.lines_styled - before, text.count('\n') + text.count('\r') + 1)
+                self.assertEqual(doc.result, headLineStyle(doc.text, callback=TestCallback.abbreviation,
+                                                           preserve_blank_lines=preserve), (preserve, doc.text))
+
+    def test_replace_lines(self):
+        doc = HeadlineDocument('one\ntwo\nthree')
+        doc.replace_lines(3, 3, 'four')
+        self.assertEqual(doc.text, 'one\ntwo\nthree\nfour')
+        doc.replace_lines(0, 1, None)
+        doc.replace_lines(2, 3, None)
+        self.assertEqual(doc.text, 'two\nthree')
+        doc.replace_lines(0, 2, None)
+        self.assertEqual((len(doc), doc.text, doc.result), (1, '', ''))
+        self.assertRaises(IndexError, doc.replace_lines, 0, 2, 'x')
+
+    def test_apply_diff(self):
+        doc = HeadlineDocument('one\ntwo\nthree\nfour')
+        doc.apply_diff([(3, 4, 'the fourth'), (0, 0, 'zero'), (1, 3, 'the second')])
+        self.assertEqual(doc.text, 'zero\none\nthe second\nthe fourth')
+        self.assertEqual(doc.result, 'Zero\nOne\nThe Second\nThe Fourth')
+        self.assertRaises(ValueError, doc.apply_diff, [(0, 2, 'x'), (1, 3, 'y')])
+
+    def test_set_text(self):
+        rand = random.Random(1)
+        styler = HeadlineStyler(preserve_blank_lines=True)
+        doc = styler.document(self.random_text(rand, 50))
+        for _ in range(100):
+            lines = doc.text.split('\n')
+            i = rand.randrange(len(lines))
+            lines[i] = rand.choice(self.LINES)
+            before = doc.lines_styled
+            doc.set_text('\n'.join(lines))
+            self.assertLessEqual(doc.lines_styled - before, 1)
+            self.assertEqual(doc.result, styler.style(doc.text))
+        text = self.random_text(rand, 20)
+        doc.set_text(text)
+        self.assertEqual((doc.text, doc.result), (text, styler.style(text)))
+
+
+class TestRecords(unittest.TestCase):
+    def test_cache(self):
+        styled = []
+
+        def style(text):
+            styled.append(text)
+            return headLineStyle(text)
+
+        field_styler = records.field_styler(('csv', 1), style)
+        lines = ['id,title\n'] + ['%d,the title %d\n' % (i, i % 3) for i in range(10)]
+        output = [field_styler.style_record(raw, row) for raw, row in records.iter_csv_records(lines)]
+        self.assertEqual(output[:3], ['id,Title\n', '0,The Title 0\n', '1,The Title 1\n'])
+        self.assertEqual(styled, ['title', 'the title 0', 'the title 1', 'the title 2'])
+
+    def test_csv_other_columns(self):
+        field_styler = records.field_styler(('csv', 1), headLineStyle)
+        lines = ['"1", "a tale",x\r\n', '2,a "quoted" tale,x\n', '3,"a ""quoted"" tale","a,b"\n',
+                 '4,a tale of\n', '"two\n', 'cities"\n']
+        self.assertEqual([field_styler.style_record(raw, row) for raw, row in records.iter_csv_records(lines)],
+                         ['"1", "A Tale",x\r\n', '2,A "Quoted" Tale,x\n', '3,"A ""Quoted"" Tale","a,b"\n',
+                          '4,A Tale Of\n', '"two\ncities"\n'])
+
+    def test_jsonl_other_fields(self):
+        field_styler = records.field_styler(('jsonl', 'article.titles.1'), headLineStyle)
+        raw = '{"n": 1.0e5, "article" : {"titles": [ "caf\\u00e9", "a caf\\u00e9 tale" ], "titles": 1},\n' \
+              ' "article": {"id": "x", "titles": ["café", "a tale"]}}\n'
+        self.assertEqual(field_styler.style_record(raw, None), raw.replace('a tale', 'A Tale'))
+        self.assertEqual(field_styler.style_record('{"article": {"titles": ["a", "a caf\\u00e9 tale"]}}', None),
+                         '{"article": {"titles": ["a", "A Café Tale"]}}')
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def style(self, cache, pairs):
+        found, misses = cache.lookup(pairs)
+        return cache.fill(pairs, found, [headLineStyle(line) + line_break for line, line_break in misses])
+
+    def test_lookup(self):
+        pairs = [('a thing', '\n'), ('another thing', '\n'), ('a thing', '')]
+        with ResultCache(self.path, fingerprint('a')) as cache:
+            self.assertEqual(self.style(cache, pairs), ['A Thing\n', 'Another Thing\n', 'A Thing'])
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+        with ResultCache(self.path, fingerprint('a')) as cache:
+            self.assertEqual(self.style(cache, pairs), ['A Thing\n', 'Another Thing\n', 'A Thing'])
+            self.assertEqual((cache.hits, cache.misses), (3, 0))
+        # Lines styled with another configuration are not reused
+        with ResultCache(self.path, fingerprint('b')) as cache:
+            self.assertEqual(cache.lookup(pairs)[0], [None, None, None])
+
+    def test_evict(self):
+        with ResultCache(self.path, fingerprint(), max_entries=10, flush_size=4) as cache:
+            self.style(cache, [('title %d' % i, '\n') for i in range(25)])
+        with ResultCache(self.path, fingerprint(), max_entries=10) as cache:
+            found, misses = cache.lookup([('title %d' % i, '\n') for i in range(25)])
+            self.assertEqual(len(misses), 15)
+
+
+class TestColumnar(unittest.TestCase):
+    titles = ['the quick brown fox', None, 'a tcp wrapper', 'the quick brown fox', 'A TCP WRAPPER']
+
+    def expected(self, callback=None):
+        return [None if title is None else headLineStyle(title, callback=callback) for title in self.titles]
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_series(self):
+        from headLineStyle.columnar import headline_style_series
+        series = pandas.Series(self.titles, index=range(10, 15), name='title')
+        result = headline_style_series(series)
+        # Null values come back as the null value of the input, which is
+        # None or nan depending on the version of pandas
+        expected = self.expected()
+        expected[1] = series.iloc[1]
+        self.assertEqual(result.tolist(), expected)
+        self.assertEqual(result.dtype, series.dtype)
+        self.assertEqual(result.name, 'title')
+        self.assertEqual(result.index.tolist(), list(range(10, 15)))
+        result = headline_style_series(pandas.Series(self.titles, dtype=object))
+        self.assertEqual(result.tolist(), self.expected())
+        callback = Wordlist(['TCP'])
+        result = headline_style_series(pandas.Series(self.titles, dtype=object), callback=callback)
+        self.assertEqual(result.tolist(), self.expected(callback))
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_series_dtypes(self):
+        from headLineStyle.columnar import headline_style_series
+        expected = ['The Quick Brown Fox', 'A TCP Wrapper', 'The Quick Brown Fox', 'A TCP Wrapper']
+        for dtype in ('string', 'category'):
+            with self.subTest(dtype=dtype):
+                series = pandas.Series(self.titles, dtype=dtype)
+                result = headline_style_series(series)
+                self.assertEqual(str(result.dtype), dtype)
+                self.assertTrue(result.isna()[1])
+                self.assertEqual(result.dropna().tolist(), expected)
+        self.assertTrue(headline_style_series(pandas.Series([float('nan'), 'a thing'])).isna()[0])
+        result = headline_style_series(pandas.Series(['a tcp wrapper', pandas.NA], dtype='string'))
+        self.assertIs(result[1], pandas.NA)
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_series_ordered_category(self):
+        from headLineStyle.columnar import headline_style_series
+        dtype = pandas.CategoricalDtype(['the low', 'A LOW', 'the high', 'unused'], ordered=True)
+        series = pandas.Series(['the high', None, 'the low', 'A LOW'], dtype=dtype)
+        result = headline_style_series(series)
+        self.assertTrue(result.dtype.ordered)
+        self.assertEqual(result.cat.categories.tolist(), ['The Low', 'A Low', 'The High', 'Unused'])
+        self.assertEqual(result.tolist()[::2], ['The High', 'The Low'])
+        self.assertTrue(result.isna()[1])
+        self.assertEqual(result.min(), 'The Low')
+        self.assertEqual(result.max(), 'The High')
+        self.assertEqual(headline_style_series(pandas.Series([], dtype=object)).tolist(), [])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow(self):
+        from headLineStyle.columnar import headline_style_arrow
+        for type_ in (pyarrow.string(), pyarrow.large_string()):
+            with self.subTest(type=type_):
+                array = pyarrow.array(self.titles, type=type_)
+                result = headline_style_arrow(array)
+                self.assertEqual(result.type, type_)
+                self.assertEqual(result.to_pylist(), self.expected())
+                chunked = pyarrow.chunked_array([self.titles[:2], self.titles[2:]], type=type_)
+                result = headline_style_arrow(chunked)
+                self.assertIsInstance(result, pyarrow.ChunkedArray)
+                self.assertEqual(result.to_pylist(), self.expected())
+        encoded = pyarrow.array(self.titles).dictionary_encode()
+        result = headline_style_arrow(encoded)
+        self.assertEqual(result.type, encoded.type)
+        self.assertEqual(result.to_pylist(), self.expected())
+
+
+class TestCommandLine(unittest.TestCase):
+    @staticmethod
+    def run_cmd(*args, **kwargs):
+        return subprocess.run(
+            [sys.executable, '-c', 'import headLineStyle; headLineStyle.cmd()'] + list(args),
+            cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'),
+            stdout=subprocess.PIPE, universal_newlines=True, check=True, **kwargs).stdout
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_arguments(self):
+        self.assertEqual(self.run_cmd('make', 'me', 'a', 'title', '-w', os.devnull), 'Make Me a Title')
+
+    def test_stdin(self):
+        s = 'Line number one\n\nand Line three\n'
+        self.assertEqual(self.run_cmd('-w', os.devnull, input=s), 'Line Number One\nAnd Line Three\n')
+        self.assertEqual(self.run_cmd('-w', os.devnull, '--preserve-blank-lines', input=s),
+                         'Line Number One\n\nAnd Line Three\n')
+
+    @unittest.skipIf(sys.platform == 'win32', 'select() only works on sockets on Windows')
+    def test_stdin_flushed(self):
+        import select
+        env = dict(os.environ)
+        env.pop('PYTHONUNBUFFERED', None)
+        process = subprocess.Popen(
+            [sys.executable, '-c', 'import headLineStyle; headLineStyle.cmd()', '-w', os.devnull],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        try:
+            for line in (b'a thing\n', b'another thing\n'):
+                process.stdin.write(line)
+                process.stdin.flush()
+                # Every line comes out before the input ends
+                self.assertTrue(select.select([process.stdout], [], [], 10)[0])
+                self.assertEqual(process.stdout.readline(), line.title())
+        finally:
+            process.stdin.close()
+            process.stdout.close()
+            process.wait()
+
+    def test_input_file(self):
+        # Input files are read with universal newlines
+        s = 'the first line\r\nthe second line\r\rthird\rfourth\n\n\nlast \u00f1and\u00fa line'
+        expected = 'The First Line\nThe Second Line\nThird\nFourth\nLast \u00d1and\u00fa Line'
+        expected_blank = 'The First Line\nThe Second Line\n\nThird\nFourth\n\n\nLast \u00d1and\u00fa Line'
+        input_path = os.path.join(self.dir, 'input.txt')
+        output_path = os.path.join(self.dir, 'output.txt')
+        with open(input_path, 'wb') as f:
+            f.write(s.encode('utf-8'))
+        for preserve, result in (([], expected), (['--preserve-blank-lines'], expected_blank)):
+            for jobs in ('1', '2'):
+                with self.subTest(preserve=preserve, jobs=jobs):
+                    self.assertEqual(self.run_cmd('-w', os.devnull, '-f', input_path, '-j', jobs, *preserve),
+                                     result)
+                    self.run_cmd('-w', os.devnull, '-f', input_path, '-o', output_path, '-j', jobs, *preserve)
+                    with open(output_path, 'rb') as f:
+                        self.assertEqual(f.read().decode('utf-8'), result)
+        with open(input_path, 'w'):
+            pass
+        self.assertEqual(self.run_cmd('-w', os.devnull, '-f', input_path), '')
+
+    def test_cache(self):
+        input_path = os.path.join(self.dir, 'input.txt')
+        cache_path = os.path.join(self.dir, 'cache.db')
+        with open(input_path, 'w') as f:
+            f.write('the first line\nthe second line\nthe first line\n')
+        expected = 'The First Line\nThe Second Line\nThe First Line\n'
+        for jobs in ('1', '2', '1'):
+            with self.subTest(jobs=jobs):
+                self.assertEqual(self.run_cmd('-w', os.devnull, '-f', input_path, '--cache', cache_path, '-j', jobs),
+                                 expected)
+        self.assertEqual(self.run_cmd('-w', os.devnull, '--cache', cache_path, input='the first line\nand more'),
+                         'The First Line\nAnd More')
+        with ResultCache(cache_path, 'unused') as cache:
+            self.assertEqual(cache.lookup([('the first line', '')]), ([None], [('the first line', '')]))
+
+    def test_csv_column(self):
+        s = ('id,title,body\r\n'
+             '1,the first title,"a body, with a comma"\r\n'
+             '2,"a ""quoted"" title","a body over\ntwo lines"\r\n'
+             '3,the first title,x\r\n'
+             '4,An Already Styled Title,"kept   ""as"" is"\r\n'
+             '5\r\n')
+        expected = ('id,title,body\r\n'
+                    '1,The First Title,"a body, with a comma"\r\n'
+                    '2,"A ""Quoted"" Title","a body over\ntwo lines"\r\n'
+                    '3,The First Title,x\r\n'
+                    '4,An Already Styled Title,"kept   ""as"" is"\r\n'
+                    '5\r\n')
+        for jobs in ('1', '2'):
+            with self.subTest(jobs=jobs):
+                output = subprocess.run(
+                    [sys.executable, '-c', 'import headLineStyle; headLineStyle.cmd()',
+                     '-w', os.devnull, '--csv-column', 'title', '-j', jobs],
+                    cwd=os.path.join(os.path.dirname(__file__), '..'), input=s.encode('utf-8'),
+                    stdout=subprocess.PIPE, check=True).stdout
+                self.assertEqual(output.decode('utf-8'), expected)
+        result = subprocess.run(
+            [sys.executable, '-c', 'import headLineStyle; headLineStyle.cmd()', '--csv-column', 'nope'],
+            cwd=os.path.join(os.path.dirname(__file__), '..'), input=s, universal_newlines=True,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("No column 'nope'", result.stderr)
+
+    def test_jsonl_field(self):
+        s = ('{"title": "the first title", "views": 1}\n'
+             '\n'
+             'not json\n'
+             '{"title": 5}\n'
+             '{"meta": {"titles": ["x", "a nested title"]}}\n'
+             '{"title": "caf\\u00e9 au lait"}')
+        for path, expected in (
+                ('title', ('{"title": "The First Title", "views": 1}\n\nnot json\n{"title": 5}\n'
+                           '{"meta": {"titles": ["x", "a nested title"]}}\n{"title": "Caf\u00e9 Au Lait"}')),
+                ('meta.titles.1', ('{"title": "the first title", "views": 1}\n\nnot json\n{"title": 5}\n'
+                                   '{"meta": {"titles": ["x", "A Nested Title"]}}\n'
+                                   '{"title": "caf\\u00e9 au lait"}'))):
+            for jobs in ('1', '2'):
+                with self.subTest(path=path, jobs=jobs):
+                    self.assertEqual(self.run_cmd('-w', os.devnull, '--jsonl-field', path, '-j', jobs, input=s),
+                                     expected)
+
+    def test_lazy_imports(self):
+        # Importing the package loads neither its submodules nor the regex
+        # backend, and styling ASCII text compiles none of the patterns of
+        # the rules for Unicode words
+        code = ('import sys, headLineStyle; '
+                'print(sorted(m for m in sys.modules if m.startswith("headLineStyle.")), '
+                '"regex" in vars(headLineStyle)); '
+                'headLineStyle.headLineStyle("the quick brown fox: a title"); '
+                'print(" ".join(name for name in ("APOS_SECOND", "CAPFIRST", "INLINE_PERIOD", "UC_ELSEWHERE", '
+                '"UC_INITIALS") if not isinstance(vars(headLineStyle)[name], headLineStyle._LazyPattern)))')
+        output = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(os.path.dirname(__file__), '..'),
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        self.assertEqual(output.splitlines(), ['[] False', ''])
+
+    def test_jobs(self):
+        s = ''.join('%s\n\n' % data[0] for data in TEST_DATA)
+        for preserve in ([], ['--preserve-blank-lines']):
+            with self.subTest(preserve=preserve):
+                serial = self.run_cmd('-w', os.devnull, *preserve, input=s)
+                self.assertEqual(self.run_cmd('-w', os.devnull, '--jobs', '2', *preserve, input=s), serial)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_server(self, address, client, **kwargs):
+        async def run():
+            server, batcher = await start_server(address, HeadlineStyler(), max_batch=4, max_wait=0.001, **kwargs)
+            try:
+                return await client(server), batcher
+            finally:
+                server.close()
+                await server.wait_closed()
+        return asyncio.run(run())
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets are not available')
+    def test_unix_socket(self):
+        texts = [data[0].replace('\n', ' ') for data in TEST_DATA]
+        path = os.path.join(self.dir, 'headLineStyle.sock')
+
+        async def client(server):
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(''.join(text + '\n' for text in texts).encode('utf-8'))
+            results = [(await reader.readline()).decode('utf-8').rstrip('\n') for _ in texts]
+            writer.close()
+            return results
+
+        results, batcher = self.run_server(path, client)
+        self.assertEqual(results, [headLineStyle(text) for text in texts])
+        self.assertEqual(batcher.texts, len(texts))
+        self.assertGreater(batcher.batches, 1)
+        # The socket of a previous daemon is replaced
+        self.run_server(path, lambda server: asyncio.sleep(0))
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets are not available')
+    def test_unix_socket_long_line(self):
+        path = os.path.join(self.dir, 'headLineStyle.sock')
+
+        async def client(server):
+            reader, writer = await asyncio.open_unix_connection(path)
+            # The second long line only ends after the limit has been read
+            writer.write(b'a thing\n' + b'x' * 500 + b'\nthe next thing\n' + b'y' * 300)
+            await writer.drain()
+            await asyncio.sleep(0.01)
+            writer.write(b'y' * 300 + b'\nthe last thing\n')
+            results = [(await reader.readline()).decode('utf-8').rstrip('\n') for _ in range(5)]
+            writer.close()
+            return results
+
+        results, _ = self.run_server(path, client, max_line_length=100)
+        self.assertEqual(results, ['A Thing', 'ERROR: line longer than 100 bytes', 'The Next Thing',
+                                   'ERROR: line longer than 100 bytes', 'The Last Thing'])
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets are not available')
+    def test_unix_socket_over_file(self):
+        path = os.path.join(self.dir, 'precious.txt')
+        with open(path, 'w') as f:
+            f.write('precious')
+        with self.assertRaises(FileExistsError):
+            self.run_server(path, lambda server: asyncio.sleep(0))
+        with open(path) as f:
+            self.assertEqual(f.read(), 'precious')
+
+    def test_http(self):
+        async def client(server):
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            results = []
+            for text in ('a thing', 'THIS IS ALL CAPS'):
+                body = text.encode('utf-8')
+                writer.write(b'POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+                status = await reader.readline()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line == b'\r\n':
+                        break
+                    name, _, value = line.partition(b':')
+                    headers[name.lower()] = value.strip()
+                body = await reader.readexactly(int(headers[b'content-length']))
+                results.append((status.strip(), body.decode('utf-8')))
+            writer.close()
+            return results
+
+        results, _ = self.run_server('127.0.0.1:0', client)
+        self.assertEqual(results, [(b'HTTP/1.1 200 OK', 'A Thing'), (b'HTTP/1.1 200 OK', 'This Is All Caps')])
+
+    def test_http_undecodable(self):
+        async def client(server):
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            body = b'caf\xe9 au lait'
+            writer.write(b'POST / HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s' % (len(body), body))
+            response = await reader.read()
+            writer.close()
+            return response
+
+        response, _ = self.run_server('127.0.0.1:0', client)
+        self.assertTrue(response.startswith(b'HTTP/1.1 200 OK'))
+        self.assertTrue(response.endswith(b'\r\n\r\nCaf\xe9 Au Lait'))
+
+
 if __name__ == '__main__':
     unittest.main()
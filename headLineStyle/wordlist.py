@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+"""
+Wordlists of canonical spellings for headLineStyle.
+"""
+
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+# Compiled wordlist files start with this header: the magic bytes, the
+# format version, the number of words, the number of hash table slots and
+# the byte size of the phrase section at the end of the file.
+MAGIC = b'HLSWORDS'
+VERSION = 2
+_HEADER = struct.Struct('<8sIIII')
+_UINT32 = struct.Struct('<I')
+_KEY_VALUE = struct.Struct('<III')
+# The phrase section starts at a multiple of 4 bytes with this header: the
+# number of phrases, of automaton nodes and of automaton edges.
+_PHRASES_HEADER = struct.Struct('<III')
+
+
+def _fold(text):
+    """
+    Fold the case of `text` for phrase matching, one character for one
+    character so that offsets into the folded text are offsets into `text`.
+    Tabs fold to spaces, as both separate words.
+    """
+    folded = text.lower()
+    if len(folded) != len(text):
+        folded = ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    return folded.replace('\t', ' ')
+
+
+class PhraseMatcher(object):
+    """
+    Aho-Corasick automaton that finds every occurrence of a set of phrases
+    in a text in a single pass, so that the cost of a search depends on the
+    length of the text and the number of matches, not on the number of
+    phrases. Matching is case-insensitive.
+    """
+
+    def __init__(self, phrases):
+        # Node 0 is the root of the trie. For every node, `_goto` maps the
+        # next character to the child node, `_fail` is the node of the
+        # longest proper suffix that is also in the trie, and `_out` has
+        # the (length, phrase index) of every phrase ending at the node.
+        self.phrases = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for phrase in phrases:
+            self._add(phrase)
+        self._link()
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _add(self, phrase):
+        goto = self._goto
+        node = 0
+        for c in _fold(phrase):
+            child = goto[node].get(c)
+            if child is None:
+                child = len(goto)
+                goto[node][c] = child
+                goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = child
+        # A later spelling of the same phrase replaces an earlier one
+        self._out[node] = ((len(phrase), len(self.phrases)),)
+        self.phrases.append(phrase)
+
+    def _link(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and c not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(c, 0)
+                out[child] = out[child] + out[fail[child]]
+
+    def finditer(self, text):
+        """
+        Yield ``(start, end, phrase)`` for every occurrence of a phrase in
+        `text`, including overlapping ones, ordered by their end.
+        """
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self.phrases
+        node = 0
+        for end, c in enumerate(_fold(text), 1):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            for length, index in out[node]:
+                yield end - length, end, phrases[index]
+
+
+class MappedPhraseMatcher(object):
+    """
+    `PhraseMatcher` whose automaton is read from the phrase section of a
+    compiled wordlist through mmap, without building it again.
+
+    The section holds arrays of 32-bit integers: the offsets of every
+    phrase in the UTF-8 phrase data, the first edge of every node, the
+    characters and child nodes of the edges of each node sorted by
+    character, the failure node of every node, the phrase number plus one
+    of the phrase ending at every node, or 0, and the nearest node on the
+    chain of failure nodes with a phrase ending at it, or 0. Only the edges
+    of the root are read when the file is opened.
+    """
+
+    def __init__(self, buffer, offset):
+        count, nodes, edges = _PHRASES_HEADER.unpack_from(buffer, offset)
+        self._count = count
+        view = memoryview(buffer)
+        offset += _PHRASES_HEADER.size
+
+        def uint32s(length):
+            nonlocal offset
+            table = view[offset:offset + 4 * length].cast('I')
+            offset += 4 * length
+            if sys.byteorder != 'little':
+                # The tables are little-endian: copy them on other machines
+                table = array('I', table)
+                table.byteswap()
+            return table
+
+        self._phrase_offsets = uint32s(count + 1)
+        self._edge_start = uint32s(nodes + 1)
+        self._edge_chars = uint32s(edges)
+        self._edge_children = uint32s(edges)
+        self._fail = uint32s(nodes)
+        self._out = uint32s(nodes)
+        self._out_link = uint32s(nodes)
+        self._data = view[offset:]
+        # Most characters of a text are matched at the root
+        self._root = dict((chr(self._edge_chars[i]), self._edge_children[i])
+                          for i in range(self._edge_start[0], self._edge_start[1])) if nodes else {}
+        self._decoded = {}
+
+    def __len__(self):
+        return self._count
+
+    def _phrase(self, index):
+        phrase = self._decoded.get(index)
+        if phrase is None:
+            start, end = self._phrase_offsets[index], self._phrase_offsets[index + 1]
+            phrase = self._decoded[index] = bytes(self._data[start:end]).decode('utf-8', 'surrogatepass')
+        return phrase
+
+    @property
+    def phrases(self):
+        return [self._phrase(index) for index in range(self._count)]
+
+    def finditer(self, text):
+        """See `PhraseMatcher.finditer`"""
+        root, fail, out, out_link = self._root, self._fail, self._out, self._out_link
+        edge_start, edge_chars, edge_children = self._edge_start, self._edge_chars, self._edge_children
+        node = 0
+        for end, c in enumerate(_fold(text), 1):
+            code = ord(c)
+            while node:
+                lo, hi = edge_start[node], edge_start[node + 1]
+                i = bisect_left(edge_chars, code, lo, hi)
+                if i < hi and edge_chars[i] == code:
+                    node = edge_children[i]
+                    break
+                node = fail[node]
+            else:
+                node = root.get(c, 0)
+            match = node if out[node] else out_link[node]
+            while match:
+                phrase = self._phrase(out[match] - 1)
+                yield end - len(phrase), end, phrase
+                match = out_link[match]
+
+
+def _pack_phrase_matcher(matcher):
+    """Return the phrase section of a compiled wordlist for a `PhraseMatcher`"""
+    goto, fail, out = matcher._goto, matcher._fail, matcher._out
+    nodes = len(goto)
+    edge_start = array('I', [0])
+    edge_chars = array('I')
+    edge_children = array('I')
+    for edges in goto:
+        for c, child in sorted(edges.items()):
+            edge_chars.append(ord(c))
+            edge_children.append(child)
+        edge_start.append(len(edge_chars))
+    # The outputs of a node are those of its own phrase, if any, followed
+    # by those of its failure node
+    own = array('I', [0] * nodes)
+    for node in range(1, nodes):
+        if len(out[node]) > len(out[fail[node]]):
+            own[node] = out[node][0][1] + 1
+    out_link = array('I', [0] * nodes)
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        queue.extend(goto[node].values())
+        failure = fail[node]
+        out_link[node] = failure if own[failure] else out_link[failure]
+    data = []
+    phrase_offsets = array('I', [0])
+    size = 0
+    for phrase in matcher.phrases:
+        encoded = phrase.encode('utf-8', 'surrogatepass')
+        data.append(encoded)
+        size += len(encoded)
+        phrase_offsets.append(size)
+    tables = [phrase_offsets, edge_start, edge_chars, edge_children, array('I', fail), own, out_link]
+    if sys.byteorder != 'little':
+        for table in tables:
+            table.byteswap()
+    return b''.join([_PHRASES_HEADER.pack(len(matcher.phrases), nodes, len(edge_chars))] +
+                    [table.tobytes() for table in tables] + data)
+
+
+class Wordlist(object):
+    """
+    Canonical spellings of words and phrases, e.g. acronyms and brand names,
+    to be kept as they are during title-casing.
+
+    A wordlist is a `headLineStyle` callback for its single words, which are
+    looked up by their upper case form. Entries of several words are found
+    in a whole line with `find_phrases` instead, which `headLineStyle` does
+    for every line when given a wordlist with phrases.
+
+    >>> from headLineStyle import headLineStyle
+    >>> wordlist = Wordlist(['UDP', 'New York Times', 'iPhone 15 Pro'])
+    >>> headLineStyle('new york times reviews the iphone 15 pro over udp', callback=wordlist)
+    'New York Times Reviews the iPhone 15 Pro Over UDP'
+    """
+
+    def __init__(self, entries=()):
+        self.words = {}
+        phrases = []
+        for entry in entries:
+            entry = entry.strip()
+            if ' ' in entry or '\t' in entry:
+                phrases.append(' '.join(entry.split()))
+            elif entry:
+                self.words[entry.upper()] = entry
+        self.phrases = PhraseMatcher(phrases) if phrases else None
+
+    def __len__(self):
+        return len(self.words) + (len(self.phrases) if self.phrases else 0)
+
+    def __call__(self, word, **kwargs):
+        return self.words.get(word.upper())
+
+    def find_phrases(self, line):
+        """
+        Return the ``(start, end, phrase)`` spans of `line` that are phrases
+        of the wordlist, where `phrase` has the canonical spelling. Phrases
+        have to start and end at word boundaries, and when two of them
+        overlap the one starting first, or else the longest, is used.
+        """
+        if self.phrases is None:
+            return []
+        matches = []
+        for start, end, phrase in self.phrases.finditer(line):
+            if start > 0 and line[start - 1].isalnum():
+                continue
+            if end < len(line) and line[end].isalnum():
+                continue
+            matches.append((start, end, phrase))
+        if len(matches) > 1:
+            matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+            spans = []
+            last_end = 0
+            for match in matches:
+                if match[0] >= last_end:
+                    spans.append(match)
+                    last_end = match[1]
+            return spans
+        return matches
+
+
+class MappedWords(object):
+    """
+    Read-only mapping of upper case words to their canonical spelling,
+    looked up in a compiled wordlist file through mmap.
+
+    The file holds an open-addressing hash table of entry numbers, keyed on
+    the CRC-32 of the UTF-8 encoded upper case word, followed by the offsets
+    of every key and value in the string data. Nothing is parsed when the
+    file is opened, and processes opening the same file share its pages.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, slots, self.phrases_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a compiled wordlist of version %d' % (file_path, VERSION))
+        self._mask = slots - 1
+        self._slots = _HEADER.size
+        self._offsets = self._slots + 4 * slots
+        self._strings = self._offsets + 4 * (2 * self._count + 1)
+        # The phrase section is aligned for its integer arrays
+        self.phrases_offset = self._strings + _UINT32.unpack_from(self._map, self._strings - 4)[0]
+        self.phrases_offset += -self.phrases_offset % 4
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def _entry(self, index):
+        key_start, key_end, value_end = _KEY_VALUE.unpack_from(self._map, self._offsets + 8 * index)
+        return self._strings + key_start, self._strings + key_end, self._strings + value_end
+
+    def get(self, key, default=None):
+        data = key.encode('utf-8', 'surrogatepass')
+        slot = zlib.crc32(data) & self._mask
+        while True:
+            index = _UINT32.unpack_from(self._map, self._slots + 4 * slot)[0]
+            if not index:
+                return default
+            key_start, key_end, value_end = self._entry(index - 1)
+            if self._map[key_start:key_end] == data:
+                return self._map[key_end:value_end].decode('utf-8', 'surrogatepass')
+            slot = (slot + 1) & self._mask
+
+    def values(self):
+        for index in range(self._count):
+            _, key_end, value_end = self._entry(index)
+            yield self._map[key_end:value_end].decode('utf-8', 'surrogatepass')
+
+    def phrase_matcher(self):
+        """Return the `MappedPhraseMatcher` of the phrases of the file, or None if it has none"""
+        if not self.phrases_size:
+            return None
+        return MappedPhraseMatcher(self._map, self.phrases_offset)
+
+
+def is_compiled_wordlist(file_path):
+    """Return whether the file at `file_path` is a compiled wordlist"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def open_compiled_wordlist(file_path):
+    """Open a wordlist file written by `compile_wordlist`"""
+    words = MappedWords(file_path)
+    wordlist = Wordlist()
+    wordlist.words = words
+    wordlist.phrases = words.phrase_matcher()
+    return wordlist
+
+
+def compile_wordlist(entries, file_path):
+    """
+    Write the wordlist `entries`, e.g. the lines of a wordlist text file,
+    to `file_path` in the compiled format read by `open_compiled_wordlist`.
+    Returns the `Wordlist` of the entries.
+    """
+    wordlist = Wordlist(entries)
+    items = [(key.encode('utf-8', 'surrogatepass'), value.encode('utf-8', 'surrogatepass'))
+             for key, value in wordlist.words.items()]
+    slots = 8
+    while slots < 2 * len(items):
+        slots *= 2
+    mask = slots - 1
+    table = [0] * slots
+    offsets = [0]
+    strings = []
+    size = 0
+    for index, (key, value) in enumerate(items):
+        slot = zlib.crc32(key) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = index + 1
+        size += len(key)
+        offsets.append(size)
+        size += len(value)
+        offsets.append(size)
+        strings.append(key)
+        strings.append(value)
+    if size >= 2 ** 32:
+        raise ValueError('Wordlist too large to compile')
+    phrases = _pack_phrase_matcher(wordlist.phrases) if wordlist.phrases else b''
+    with open(file_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(items), slots, len(phrases)))
+        f.write(struct.pack('<%dI' % slots, *table))
+        f.write(struct.pack('<%dI' % len(offsets), *offsets))
+        f.writelines(strings)
+        f.write(b'\0' * (-(_HEADER.size + 4 * (slots + len(offsets)) + size) % 4))
+        f.write(phrases)
+    return wordlist
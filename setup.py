@@ -12,7 +12,7 @@ setuptools.setup(
     version="1.5.7",  # The initial release version
     author="Vinod Baste",  # Full name of the author
     url="https://github.com/vinodbaste/python_headline_style",
-    packages=setuptools.find_packages(),  # List of all python modules to be installed
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),  # List of all python modules to be installed
     readme="README.md",
     description="About This filter changes a given text to Title Caps, and attempts to be clever about SMALL words "
                 "like a/an/the in the input. The list of SMALL words which are not capped comes from the New York "
@@ -125,5 +125,12 @@ limitations under the License.
     python_requires='>=3.7',  # Minimum version requirement of the package
     py_modules=["headline_style"],  # Name of the python package
     install_requires=["regex >=2020.4.4"],  # Install other dependencies if any
+    extras_require={"pandas": ["pandas"], "arrow": ["pyarrow"]},  # For headLineStyle.columnar
+    entry_points={
+        "console_scripts": [
+            "headLineStyle = headLineStyle:cmd",
+            "headLineStyle-compile-wordlist = headLineStyle:compile_wordlist_cmd",
+        ],
+    },
     download_url="https://github.com/vinodbaste/python_headline_style/archive/refs/heads/main.zip"
 )